@@ -0,0 +1,80 @@
+"""
+Cart memory and serialization cost at 100k in-memory sessions.
+
+"dict" is the old cart: a {name: {quantity, price, emoji}} dict per session plus
+a cart_totals dict. "Cart" is the __slots__ Cart with integer cents and running
+totals. Reports traced bytes per session, total-read time and to_state/json size.
+
+Usage: python benchmarks/bench_cart_memory.py [--sessions 100000] [--lines 3]
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+
+from cart import Cart
+
+PRODUCTS = [("Salt", 2.50, "🧂"), ("Soap", 3.99, "🧼"), ("Toothpaste", 4.50, "🦷"),
+            ("Shampoo", 6.99, "🧴"), ("Towel", 8.99, "🏖️")]
+
+
+def dict_cart(lines: int):
+    cart = {name: {'quantity': 2, 'price': price, 'emoji': emoji} for name, price, emoji in PRODUCTS[:lines]}
+    totals = {'count': sum(item['quantity'] for item in cart.values()),
+              'total': sum(item['quantity'] * item['price'] for item in cart.values())}
+    return cart, totals
+
+
+def slots_cart(lines: int):
+    cart = Cart()
+    for name, price, emoji in PRODUCTS[:lines]:
+        cart.set_quantity(name, 2, price, emoji)
+    return cart
+
+
+def traced_bytes(build, sessions: int, lines: int):
+    """Bytes allocated (and still live) to build `sessions` carts"""
+    gc.collect()
+    tracemalloc.start()
+    carts = [build(lines) for _ in range(sessions)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return carts, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--lines", type=int, default=3, help="cart lines per session (max 5)")
+    args = parser.parse_args()
+    lines = min(args.lines, len(PRODUCTS))
+
+    old, old_bytes = traced_bytes(dict_cart, args.sessions, lines)
+    new, new_bytes = traced_bytes(slots_cart, args.sessions, lines)
+
+    start = time.perf_counter()
+    for cart, _ in old:
+        sum(item['quantity'] * item['price'] for item in cart.values())
+    old_total_us = (time.perf_counter() - start) / args.sessions * 1e6
+    start = time.perf_counter()
+    for cart in new:
+        cart.total
+    new_total_us = (time.perf_counter() - start) / args.sessions * 1e6
+
+    old_json = len(json.dumps(old[0][0]))
+    new_json = len(json.dumps(new[0].to_state()))
+
+    print(f"{args.sessions} sessions x {lines} lines")
+    print(f"{'':<6} {'bytes/session':>14} {'total() us':>11} {'json bytes':>11}")
+    print(f"{'dict':<6} {old_bytes / args.sessions:>14.0f} {old_total_us:>11.3f} {old_json:>11}")
+    print(f"{'Cart':<6} {new_bytes / args.sessions:>14.0f} {new_total_us:>11.3f} {new_json:>11}")
+    print(f"memory saved: {(old_bytes - new_bytes) / 2**20:.1f} MiB ({1 - new_bytes / old_bytes:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Cart render time and payload size against cart size: full re-render vs incremental update.
+
+Usage: python benchmarks/bench_cart_render.py [--sizes 10 100 1000]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from fasthtml.common import Div, to_xml
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    import ecommerce_ui
+    from session_store import new_session
+
+    print(f"{'lines':>6} {'full us':>9} {'full bytes':>11} {'incr us':>9} {'incr bytes':>11}")
+    for size in args.sizes:
+        session_data = new_session()
+        for i in range(size):
+            session_data['cart'].apply({"action": "add", "product": f"Item {i}", "quantity": 1, "price": 1.25, "emoji": "📦"})
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            session_data['cart'].set_quantity("Item 0", 2)
+            full = to_xml(Div(*ecommerce_ui.get_cart_items(session_data)))
+        full_us = (time.perf_counter() - start) / args.repeat * 1e6
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            session_data['cart'].set_quantity("Item 0", 2)
+            incremental = to_xml(Div(*ecommerce_ui.cart_item_response(session_data, "Item 0")))
+        incr_us = (time.perf_counter() - start) / args.repeat * 1e6
+
+        print(f"{size:>6} {full_us:>9.1f} {len(full.encode()):>11} {incr_us:>9.1f} {len(incremental.encode()):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Catalog lookup latency at 10, 10k and 100k products.
+
+Compares the indexed Catalog against the old linear scan over a product list.
+
+Usage: python benchmarks/bench_catalog.py [--sizes 10 10000 100000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+
+from catalog import Catalog
+
+WORDS = ["salt", "pepper", "soap", "shampoo", "towel", "brush", "paste", "detergent", "rice", "oil",
+         "sugar", "flour", "tea", "coffee", "milk", "bread", "butter", "cheese", "apple", "banana"]
+
+
+def make_products(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    products = []
+    for i in range(n):
+        name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}"
+        products.append({"name": name, "price": round(rng.uniform(1, 50), 2), "emoji": "📦"})
+    return products
+
+
+def per_call_us(fn, queries) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def misspell(name: str, rng) -> str:
+    i = rng.randrange(len(name) - 1)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'size':>8} {'build ms':>9} {'scan us':>9} {'get us':>8} {'prefix us':>10} {'fuzzy us':>9}")
+    for size in args.sizes:
+        products = make_products(size)
+        start = time.perf_counter()
+        catalog = Catalog(products)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        names = [rng.choice(products)["name"].upper() for _ in range(args.queries)]
+        typos = [misspell(name.lower(), rng) for name in names]
+        prefixes = [name[:5] for name in names]
+
+        scan = per_call_us(lambda q: next((p for p in products if p["name"].lower() == q.lower()), None), names)
+        get = per_call_us(catalog.get, names)
+        prefix = per_call_us(catalog.prefix, prefixes)
+        fuzzy = per_call_us(catalog.fuzzy, typos)
+        print(f"{size:>8} {build_ms:>9.1f} {scan:>9.1f} {get:>8.2f} {prefix:>10.2f} {fuzzy:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+/messages latency at 10, 1k and 10k stored messages.
+
+Both columns are client.get("/messages") through the same ASGI client and app.
+For "before", a baseline handler is routed ahead of the real one and renders
+every stored message, as /messages used to. "after" is the paginated endpoint,
+which renders only the newest page. Run with --store sqlite to include loading
+the session from the SQLite store.
+
+Usage: python benchmarks/bench_messages.py [--sizes 10 1000 10000] [--store sqlite]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import httpx
+
+
+async def seed(ecommerce_ui, session_id: str, n: int):
+    from session_store import new_session
+    session_data = new_session()
+    for i in range(n):
+        session_data['messages'].append(f"Message {i}: add {i % 9 + 1} salt to my cart please", is_user=i % 2 == 0)
+    await ecommerce_ui.save_session_data(session_id, session_data)
+
+
+@contextmanager
+def baseline_route(ecommerce_ui):
+    """Route /messages to the old handler, which renders every message, while in the block"""
+    from starlette.routing import Route
+
+    async def all_messages(request):
+        session_data = await ecommerce_ui.get_session_data(ecommerce_ui.get_session_id(request))
+        messages = session_data['messages']
+        rows, _ = await asyncio.to_thread(messages.page, None, len(messages))
+        return ecommerce_ui.render([ecommerce_ui.ChatMessage(text, is_user=is_user) for _, text, is_user in rows])
+
+    route = Route("/messages", all_messages, methods=["GET"])
+    ecommerce_ui.app.router.routes.insert(0, route)
+    try:
+        yield
+    finally:
+        ecommerce_ui.app.router.routes.remove(route)
+
+
+async def time_requests(client, session_id: str, n: int) -> tuple:
+    timings = []
+    for _ in range(n):
+        start = time.perf_counter()
+        response = await client.get("/messages", headers={"Cookie": f"session_id={session_id}"})
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, len(response.content)
+
+
+async def run(args):
+    import ecommerce_ui
+    transport = httpx.ASGITransport(app=ecommerce_ui.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        print(f"{'messages':>9} {'before p50 ms':>14} {'before bytes':>13} "
+              f"{'after p50 ms':>13} {'after p95 ms':>13} {'after bytes':>12}")
+        for size in args.sizes:
+            await seed(ecommerce_ui, f"bench-{size}", size)
+            with baseline_route(ecommerce_ui):
+                before, before_bytes = await time_requests(client, f"bench-{size}", args.repeat)
+            timings, size_bytes = await time_requests(client, f"bench-{size}", args.repeat)
+            timings.sort()
+            print(f"{size:>9} {statistics.median(before):>14.2f} {before_bytes:>13} "
+                  f"{statistics.median(timings):>13.2f} {timings[int(len(timings) * 0.95) - 1]:>13.2f} {size_bytes:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.store == "sqlite":
+            os.environ["SESSION_STORE"] = "sqlite:" + os.path.join(tmp, "sessions.db")
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Offline benchmark suite: our own overhead for both agents, without Gemini.
+
+Runs the shop app in-process with a scripted FunctionModel (fixed simulated
+latency, scripted manage_cart calls) and research_agent with the fixture search
+backend. Multi-item requests run twice, once with a manage_cart call per item and
+once with a single manage_cart_bulk call, to show the round trips saved. send_stream
+drives the default streaming UI path (/send/stream, then the /stream SSE response
+read to the end). Each scenario reports p50/p95/p99 latency, requests/sec and mean bytes
+allocated per request.
+
+With --baseline, results are compared against a saved run and the script exits
+non-zero if any scenario's p95 or allocations grew beyond --tolerance.
+
+Usage:
+    python benchmarks/bench_offline.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_offline.py --baseline benchmarks/baseline.json [--tolerance 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("SEARCH_BACKEND", "fixture")
+
+from harness import shop_model, research_model, latency_summary, allocations_per_call, model_stats
+
+import httpx
+
+SESSIONS = 20
+MULTI_ITEM_MESSAGE = "add salt, pepper, soap and toothbrush"
+
+
+def session_headers(i: int) -> dict:
+    return {"Cookie": f"session_id=bench-{i % SESSIONS}"}
+
+
+def shop_scenarios(client):
+    """name -> async fn(i) issuing one request"""
+    async def send_agent(i):
+        return await client.post("/send", data={"message": "I'd like some salt please"}, headers=session_headers(i))
+
+    async def send_question(i):
+        # Informational: after the first run per cart state it comes from the answer cache
+        return await client.post("/send", data={"message": "What do you sell?"}, headers=session_headers(i))
+
+    async def send_fast_path(i):
+        return await client.post("/send", data={"message": "add 1 salt"}, headers=session_headers(i))
+
+    async def cart_increase(i):
+        return await client.post("/cart/increase/Salt", headers=session_headers(i))
+
+    async def cart_decrease(i):
+        return await client.post("/cart/decrease/Salt", headers=session_headers(i))
+
+    async def messages(i):
+        return await client.get("/messages", headers=session_headers(i))
+
+    async def send_stream(i):
+        response = await client.post("/send/stream", data={"message": "I'd like some salt please"}, headers=session_headers(i))
+        turn_id = re.search(r'sse-connect="/stream/(\w+)"', response.text).group(1)
+        stream = await client.get(f"/stream/{turn_id}", headers=session_headers(i))
+        if "event: cart" not in stream.text or "event: done" not in stream.text:
+            raise RuntimeError(f"stream {i} ended without a cart update or done event")
+        return stream
+
+    return {"send_agent": send_agent, "send_question": send_question, "send_fast_path": send_fast_path, "cart_increase": cart_increase,
+            "cart_decrease": cart_decrease, "messages": messages, "send_stream": send_stream}
+
+
+async def run_scenario(fn, n: int, alloc_samples: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n):
+        t0 = time.perf_counter()
+        response = await fn(i)
+        latencies.append(time.perf_counter() - t0)
+        if getattr(response, "status_code", 200) != 200:
+            raise RuntimeError(f"request {i} failed with {response.status_code}")
+    result = latency_summary(latencies, time.perf_counter() - start)
+    result["alloc_bytes"] = round(await allocations_per_call(fn, alloc_samples))
+    return result
+
+
+async def run_suite(args) -> dict:
+    import ecommerce_ui
+    from task2 import agent
+    from task1 import research_agent, run_research, search_service
+
+    results = {}
+    transport = httpx.ASGITransport(app=ecommerce_ui.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        with agent.override(model=shop_model(args.latency)):
+            scenarios = shop_scenarios(client)
+            # Enough Salt in every session that the decrease scenario never empties a cart
+            for i in range(SESSIONS):
+                await client.post("/send", data={"message": "add 999 salt"}, headers=session_headers(i))
+            for name, fn in scenarios.items():
+                before = model_stats["requests"]
+                results[name] = await run_scenario(fn, args.requests, args.alloc_samples)
+                results[name]["model_requests"] = (model_stats["requests"] - before) / (args.requests + args.alloc_samples)
+
+        async def send_multi(i):
+            return await client.post("/send", data={"message": MULTI_ITEM_MESSAGE}, headers=session_headers(i))
+
+        # Multi-item turns: one manage_cart call per model response vs a single manage_cart_bulk call
+        for name, tool_mode in (("multi_per_item", "per_item"), ("multi_bulk", "bulk")):
+            with agent.override(model=shop_model(args.latency, tool_mode)):
+                before = model_stats["requests"]
+                results[name] = await run_scenario(send_multi, args.requests, args.alloc_samples)
+                results[name]["model_requests"] = (model_stats["requests"] - before) / (args.requests + args.alloc_samples)
+
+    search_service.backend.latency = args.search_latency
+
+    async def research(i):
+        # Distinct queries so neither the search cache nor the response cache answers
+        return await run_research(f"offline benchmark topic {time.perf_counter_ns()}", use_cache=False)
+
+    with research_agent.override(model=research_model(args.latency, args.searches)):
+        before = model_stats["requests"]
+        results["research"] = await run_scenario(research, args.research_requests, args.alloc_samples)
+        results["research"]["model_requests"] = (model_stats["requests"] - before) / (args.research_requests + args.alloc_samples)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Scenarios whose p95 latency or allocations exceed the baseline by more than `tolerance`"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ("p95_ms", "alloc_bytes"):
+            if previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {previous[metric]} -> {current[metric]} "
+                                   f"(+{current[metric] / previous[metric] - 1:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500, help="requests per shop scenario")
+    parser.add_argument("--research-requests", type=int, default=100)
+    parser.add_argument("--alloc-samples", type=int, default=50, help="extra traced requests per scenario")
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated model latency per request (seconds)")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="simulated search latency (seconds)")
+    parser.add_argument("--searches", type=int, default=2, help="web_search calls per research run")
+    parser.add_argument("--baseline", type=Path, help="compare against this baseline JSON")
+    parser.add_argument("--save-baseline", type=Path, help="write results to this baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed growth before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_suite(args))
+
+    print(f"{'scenario':<15} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'alloc KB':>9} {'model req':>9}")
+    for name, r in results.items():
+        print(f"{name:<15} {r['rps']:>9.1f} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} "
+              f"{r['alloc_bytes'] / 1024:>9.1f} {r['model_requests']:>9.2f}")
+
+    per_item, bulk = results["multi_per_item"], results["multi_bulk"]
+    print(f"manage_cart_bulk: {per_item['model_requests'] - bulk['model_requests']:.1f} fewer model round trips, "
+          f"{per_item['p50_ms'] - bulk['p50_ms']:.3f}ms lower p50 per multi-item request")
+
+    from answer_cache import answer_cache_stats
+    lookups = answer_cache_stats["hits"] + answer_cache_stats["misses"]
+    print(f"answer cache: {answer_cache_stats['hits']}/{lookups} hits "
+          f"({answer_cache_stats['hits'] / lookups if lookups else 0:.0%}), {answer_cache_stats['stores']} stored")
+
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print("FAIL" if regressions else f"PASS: within {args.tolerance:.0%} of {args.baseline}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Page fetch pipeline against a local HTTP stand-in: fetch, extract, dedupe, rank.
+
+Serves synthetic result pages from a local threaded HTTP server: articles wrapped
+in navigation, scripts and footers, near-duplicate copies of some of them, one
+page slower than the fetch timeout and one 404. The same search results go
+through PageService three ways:
+  - sequential:  one fetch at a time, no page cache
+  - pooled:      --concurrency fetches over the pooled client, cold page cache
+  - warm cache:  pooled again, every page served from the disk cache
+
+Exits non-zero if a near-duplicate page is not dropped or no passages come back.
+
+Usage: python benchmarks/bench_page_fetch.py [--pages 10] [--duplicates 3] [--latency 0.1]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task1"))
+
+from pages import HttpFetcher, PageCache, PageService, format_passages, page_stats
+
+QUERY = "solar battery storage costs"
+VOCAB = ("energy grid panel market price demand supply policy capacity install home utility "
+         "research report growth year percent region project system power").split()
+TOPIC = QUERY.split()
+
+
+def make_article(rng, i: int) -> list:
+    paragraphs = []
+    for p in range(8):
+        words = [rng.choice(VOCAB) for _ in range(rng.randint(40, 90))]
+        if p % 3 == i % 3:  # some paragraphs are about the query
+            for word in TOPIC:
+                words.insert(rng.randrange(len(words)), word)
+        paragraphs.append(" ".join(words).capitalize() + f" (article {i}, part {p}).")
+    return paragraphs
+
+
+def render_page(title: str, paragraphs: list, variant: int) -> str:
+    body = "".join(f"<p>{p}</p>" for p in paragraphs)
+    return (f"<html><head><title>{title}</title><script>var tracking = {variant};</script>"
+            f"<style>body {{ margin: {variant}px }}</style></head><body>"
+            f"<header><nav><a href='/'>Home</a> <a href='/news'>News</a> <a href='/v{variant}'>Section {variant}</a></nav></header>"
+            f"<main><article><h1>{title}</h1>{body}</article></main>"
+            f"<aside>Related: story {variant}, story {variant + 1}</aside>"
+            f"<footer>Copyright {variant} Example Media. All rights reserved. Privacy policy and terms.</footer>"
+            "</body></html>")
+
+
+def build_site(args) -> dict:
+    """path -> html; None marks the slow page"""
+    rng = random.Random(7)
+    articles = [make_article(rng, i) for i in range(args.pages)]
+    site = {f"/page/{i}": render_page(f"Article {i}", paragraphs, i) for i, paragraphs in enumerate(articles)}
+    for d in range(args.duplicates):
+        # Syndicated copy: different chrome and one edited paragraph
+        paragraphs = list(articles[d])
+        paragraphs[-1] = paragraphs[-1].replace("(article", "(updated article")
+        site[f"/mirror/{d}"] = render_page(f"Article {d} (mirror)", paragraphs, 100 + d)
+    site["/slow"] = None
+    return site
+
+
+def serve(site: dict, latency: float, slow_latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in site:
+                self.send_error(404)
+                return
+            time.sleep(slow_latency if site[self.path] is None else latency)
+            body = (site[self.path] or "<html><body><p>Too late to matter.</p></body></html>").encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the fetcher gave up on the slow page
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        # The default backlog of 5 drops connects under --concurrency > 5, and the
+        # kernel's 1s SYN retry then looks like a page timeout
+        request_queue_size = 128
+
+    server = Server(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def run_once(service: PageService, results: list, top_k: int) -> tuple:
+    start = time.perf_counter()
+    passages = await service.passages(QUERY, results, top_k=top_k)
+    return time.perf_counter() - start, passages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10, help="distinct articles")
+    parser.add_argument("--duplicates", type=int, default=3, help="near-duplicate mirrors of the first articles")
+    parser.add_argument("--latency", type=float, default=0.1, help="server latency per page (seconds)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=1.0, help="per-page fetch timeout (seconds)")
+    parser.add_argument("--top-k", type=int, default=6)
+    args = parser.parse_args()
+
+    site = build_site(args)
+    server = serve(site, args.latency, args.timeout * 2)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    # Originals first, so each mirror is the lower-ranked copy; plus a 404
+    paths = [f"/page/{i}" for i in range(args.pages)] + [f"/mirror/{d}" for d in range(args.duplicates)] + ["/slow", "/missing"]
+    results = [{"title": path, "body": "", "href": base + path} for path in paths]
+    html_chars = sum(len(html) for html in site.values() if html)
+
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        cache = PageCache(str(Path(directory) / "pages.db"))
+        configs = {
+            "sequential": PageService(HttpFetcher(1), None, 1, args.timeout),
+            "pooled": PageService(HttpFetcher(args.concurrency), cache, args.concurrency, args.timeout),
+            "warm cache": PageService(HttpFetcher(args.concurrency), cache, args.concurrency, args.timeout),
+        }
+        print(f"{'config':<12} {'wall s':>7} {'fetched':>8} {'cached':>7} {'timeouts':>9} {'failed':>7} "
+              f"{'dupes':>6} {'passages':>9} {'chars to model':>15}")
+        for name, service in configs.items():
+            before = dict(page_stats)
+            elapsed, passages = asyncio.run(run_once(service, results, args.top_k))
+            delta = {key: page_stats[key] - before[key] for key in page_stats}
+            print(f"{name:<12} {elapsed:>7.2f} {delta['fetched']:>8} {delta['cache_hits']:>7} {delta['timeouts']:>9} "
+                  f"{delta['failed']:>7} {delta['duplicates']:>6} {len(passages):>9} {len(format_passages(passages)):>15}")
+            if delta["duplicates"] != args.duplicates:
+                failures.append(f"{name}: dropped {delta['duplicates']} duplicates, expected {args.duplicates}")
+            if not passages:
+                failures.append(f"{name}: no passages")
+        cache.close()
+    server.shutdown()
+    print(f"raw HTML across all pages: {html_chars} chars")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Requests/sec and response bytes for the / page, before and after pre-rendering.
+
+Both sides go through the same ASGI client and app. "before" is a baseline
+route mounted for the benchmark that does what the / handler used to: it
+re-renders the page tree on every request with the CSS/JS inlined. "after"
+is / itself, which serves the cached shell.
+
+Usage: python benchmarks/bench_page_shell.py [--requests 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import httpx
+from fasthtml.common import to_xml
+
+BASELINE_PATH = "/bench/before"
+
+
+def mount_baseline(ecommerce_ui):
+    """Serve the old per-request render, with the stylesheet and script inline, at BASELINE_PATH"""
+    from starlette.responses import HTMLResponse
+    css = ecommerce_ui.STATIC_ASSETS["app.css"][0].decode()
+    js = ecommerce_ui.STATIC_ASSETS["app.js"][0].decode()
+    css_link = f'<link rel="stylesheet" href="{ecommerce_ui.static_url("app.css")}">'
+    js_tag = f'<script src="{ecommerce_ui.static_url("app.js")}"></script>'
+
+    @ecommerce_ui.rt(BASELINE_PATH)
+    def get(request):
+        session_id = ecommerce_ui.get_session_id(request)
+        html = "<!doctype html>\n" + to_xml(ecommerce_ui.page_shell())
+        html = html.replace(css_link, f"<style>{css}</style>").replace(js_tag, f"<script>{js}</script>")
+        response = HTMLResponse(html)
+        response.set_cookie("session_id", session_id, max_age=86400*30)
+        return response
+
+
+async def bench_path(client, path: str, n: int) -> tuple:
+    start = time.perf_counter()
+    for _ in range(n):
+        response = await client.get(path)
+    elapsed = time.perf_counter() - start
+    return n / elapsed, len(response.content), response
+
+
+async def run(ecommerce_ui, n: int):
+    transport = httpx.ASGITransport(app=ecommerce_ui.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", cookies={"session_id": "bench"}) as client:
+        before = await bench_path(client, BASELINE_PATH, n)
+        after = await bench_path(client, "/", n)
+        revalidated = await client.get("/", headers={"If-None-Match": after[2].headers["etag"]})
+    return before, after, revalidated.status_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    import ecommerce_ui
+    mount_baseline(ecommerce_ui)
+    inline_assets = sum(len(body) for body, _, _ in ecommerce_ui.STATIC_ASSETS.values())
+
+    (before_rps, before_bytes, _), (after_rps, after_bytes, _), revalidated = asyncio.run(run(ecommerce_ui, args.requests))
+
+    print(f"before: {before_rps:8.0f} req/s  {before_bytes:7d} bytes per page load")
+    print(f"after:  {after_rps:8.0f} req/s  {after_bytes:7d} bytes per page load")
+    print(f"repeat load with If-None-Match -> {revalidated}; CSS/JS ({inline_assets} bytes) cached by the browser")
+
+
+if __name__ == "__main__":
+    main()
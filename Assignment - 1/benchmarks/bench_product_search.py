@@ -0,0 +1,75 @@
+"""
+Product search latency and prompt size at 10, 10k and 100k SKUs.
+
+For each catalog size, builds the BM25 index, saves it, memory-maps it back and
+times free-text queries against the mapped index. Prompt tokens compare the old
+system prompt, which listed every product name, with the new one plus a typical
+search_products result (estimated at ~4 characters per token, like history.py).
+
+Usage: python benchmarks/bench_product_search.py [--sizes 10 10000 100000] [--queries 500]
+"""
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_catalog import WORDS, make_products
+from catalog import Catalog
+from product_search import ProductIndex
+
+# Fixed part of the system prompt around the product list, roughly
+PROMPT_BASE_CHARS = 1100
+
+
+def tokens(chars: int) -> int:
+    return chars // 4
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10, help="results per query")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'size':>8} {'build ms':>9} {'mmap ms':>8} {'p50 us':>8} {'p95 us':>8} "
+          f"{'old prompt tok':>15} {'new prompt tok':>15}")
+    for size in args.sizes:
+        catalog = Catalog(make_products(size))
+        start = time.perf_counter()
+        built = ProductIndex.build(catalog.products)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        with tempfile.TemporaryDirectory() as directory:
+            built.save(Path(directory), catalog.version)
+            start = time.perf_counter()
+            index = ProductIndex.load(Path(directory), catalog.version)
+            load_ms = (time.perf_counter() - start) * 1000
+
+            queries = [" ".join(rng.sample(WORDS, rng.choice((1, 2)))) for _ in range(args.queries)]
+            latencies = []
+            for query in queries:
+                t0 = time.perf_counter()
+                index.search(query, args.limit)
+                latencies.append(time.perf_counter() - t0)
+            p50 = statistics.median(latencies) * 1e6
+            p95 = statistics.quantiles(latencies, n=20)[-1] * 1e6
+
+            old_prompt = tokens(PROMPT_BASE_CHARS + len(", ".join(catalog.names)))
+            result_chars = sum(len(f"{catalog.products[i]['name']} - ${catalog.products[i]['price']:.2f}\n")
+                               for i in index.search(queries[0], args.limit))
+            new_prompt = tokens(PROMPT_BASE_CHARS + result_chars)
+            del index  # release the memory maps before the directory goes
+
+        print(f"{size:>8} {build_ms:>9.1f} {load_ms:>8.2f} {p50:>8.1f} {p95:>8.1f} {old_prompt:>15} {new_prompt:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Research fan-out: per-run wall time vs summed search time under the global search cap.
+
+Runs several research_agent runs at once with the scripted research model, which
+asks for --searches searches in one step, over the fixture backend with a fixed
+simulated latency. Every --slow-every'th search is slower than SEARCH_TIMEOUT, so
+those runs have to finish on partial results. Each configuration is one row:
+  - sequential: SEARCH_CONCURRENCY=1, the old one-search-at-a-time behaviour
+  - capped:     SEARCH_CONCURRENCY=--concurrency, shared by all runs
+  - capped, many: the same cap, with one web_search_many call per run
+
+Exits non-zero if more searches were in flight than the cap or any run failed.
+
+Usage: python benchmarks/bench_research_fanout.py [--runs 8] [--searches 4] [--search-latency 0.2]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SEARCH_BACKEND", "fixture")
+
+from harness import research_model
+
+from search import FixtureBackend
+
+
+class SlowQueryBackend(FixtureBackend):
+    """Fixture backend where every `slow_every`th search takes `slow_latency` instead"""
+
+    def __init__(self, latency: float, slow_latency: float, slow_every: int):
+        super().__init__(latency=latency)
+        self.slow_latency = slow_latency
+        self.slow_every = slow_every
+        self.started = 0
+
+    async def search(self, query: str, max_results: int) -> list:
+        self.started += 1
+        if self.slow_every and self.started % self.slow_every == 0:
+            await asyncio.sleep(self.slow_latency)
+        return await super().search(query, max_results)
+
+
+async def run_config(args, concurrency: int, fan_out: bool) -> dict:
+    from task1 import research_agent, run_research, search_service
+
+    search_service.backend = SlowQueryBackend(args.search_latency, args.timeout * 2, args.slow_every)
+    search_service.max_concurrency = concurrency
+    search_service.timeout = args.timeout
+    search_service.peak_active = 0
+
+    async def one(i):
+        stats = {}
+        # Distinct queries so neither the search cache nor the response cache answers
+        await run_research(f"fanout topic {i} {time.perf_counter_ns()}", use_cache=False, stats=stats)
+        return stats
+
+    start = time.perf_counter()
+    with research_agent.override(model=research_model(0.0, args.searches, fan_out)):
+        runs = await asyncio.gather(*(one(i) for i in range(args.runs)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    ok = [r for r in runs if isinstance(r, dict)]
+    return {
+        "failed": len(runs) - len(ok),
+        "elapsed": elapsed,
+        "wall_p50": statistics.median(r["wall_seconds"] for r in ok) if ok else 0.0,
+        "search_p50": statistics.median(r["search_seconds"] for r in ok) if ok else 0.0,
+        "timeouts": sum(r["timeouts"] for r in ok),
+        "peak": search_service.peak_active,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=8, help="research runs in flight at once")
+    parser.add_argument("--searches", type=int, default=4, help="searches per run")
+    parser.add_argument("--search-latency", type=float, default=0.2, help="simulated search latency (seconds)")
+    parser.add_argument("--concurrency", type=int, default=8, help="global cap on outstanding searches")
+    parser.add_argument("--timeout", type=float, default=1.0, help="per-search timeout (seconds)")
+    parser.add_argument("--slow-every", type=int, default=10, help="every Nth search exceeds the timeout (0 = none)")
+    args = parser.parse_args()
+
+    configs = {
+        "sequential": (1, False),
+        "capped": (args.concurrency, False),
+        "capped, many": (args.concurrency, True),  # one web_search_many call instead of N web_search calls
+    }
+    failures = []
+    print(f"{'config':<14} {'cap':>4} {'peak':>5} {'run wall p50 s':>15} {'search sum p50 s':>17} "
+          f"{'speedup':>8} {'timeouts':>9} {'total s':>8}")
+    for name, (concurrency, fan_out) in configs.items():
+        r = asyncio.run(run_config(args, concurrency, fan_out))
+        speedup = r["search_p50"] / r["wall_p50"] if r["wall_p50"] else 0.0
+        print(f"{name:<14} {concurrency:>4} {r['peak']:>5} {r['wall_p50']:>15.3f} {r['search_p50']:>17.3f} "
+              f"{speedup:>7.1f}x {r['timeouts']:>9} {r['elapsed']:>8.2f}")
+        if r["peak"] > concurrency:
+            failures.append(f"{name}: {r['peak']} searches in flight, cap is {concurrency}")
+        if r["failed"]:
+            failures.append(f"{name}: {r['failed']} runs failed")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Read/write latency of each session store backend.
+
+Usage: python benchmarks/bench_session_store.py [--sessions 1000] [--turns 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, UserPromptPart, TextPart, ToolCallPart, ToolReturnPart
+from session_store import MemorySessionStore, SqliteSessionStore, new_session
+
+
+def make_session(turns: int) -> dict:
+    """A session with `turns` chat turns, each with one manage_cart call"""
+    data = new_session()
+    for i in range(turns):
+        call_id = f"call_{i}"
+        data['messages'].append(f"add {i} salt", is_user=True)
+        data['messages'].append(f"Added {i} salt to your cart.", is_user=False)
+        data['agent_message_history'] += [
+            ModelRequest(parts=[UserPromptPart(content=f"add {i} salt")]),
+            ModelResponse(parts=[ToolCallPart(tool_name="manage_cart", args={"product_name": "Salt", "action": "add", "quantity": i}, tool_call_id=call_id)]),
+            ModelRequest(parts=[ToolReturnPart(tool_name="manage_cart", content='{"action": "add", "product": "Salt"}', tool_call_id=call_id)]),
+            ModelResponse(parts=[TextPart(content=f"Added {i} salt to your cart.")]),
+        ]
+        data['cart'].set_quantity('Salt', i, 2.50, '🧂')
+    return data
+
+
+def measure(fn, n):
+    timings = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(i)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return timings
+
+
+def report(name, op, timings):
+    timings.sort()
+    p50 = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<8} {op:<6} p50={p50:9.1f}us  p95={p95:9.1f}us  mean={statistics.fmean(timings):9.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=20, help="chat turns stored per session")
+    args = parser.parse_args()
+
+    data = make_session(args.turns)
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "memory": MemorySessionStore(),
+            "sqlite": SqliteSessionStore(os.path.join(tmp, "sessions.db")),
+        }
+        print(f"{args.sessions} sessions x {args.turns} turns")
+        for name, store in backends.items():
+            report(name, "write", measure(lambda i: store.save(f"s{i}", data), args.sessions))
+            report(name, "read", measure(lambda i: store.load(f"s{i}"), args.sessions))
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Cold-start time of the shop app and the research agent, with a regression budget.
+
+Each entry module is imported in a fresh interpreter several times, alternating
+with a bare interpreter (`python -c pass`) measured in the same run. Startup is
+reported as the median wall time and as a multiple of the bare interpreter's,
+so the budget holds on any machine. One `python -X importtime` run per module
+lists the heaviest imports it pulls in directly. Exits non-zero if:
+  - a module that should only load on first use (pydantic-ai, logfire, the
+    Gemini SDK, the search client, NumPy product search) is imported at startup, or
+  - a module's startup multiple exceeds the budget (benchmarks/startup_budget.json,
+    or --budget).
+
+tests/test_startup.py runs the same checks with the test suite.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --save-budget benchmarks/startup_budget.json  # after an intended change
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+TARGETS = {"ecommerce_ui": ROOT / "task2", "task1": ROOT / "task1"}
+# Loaded on first agent run / first request / first search (web or product), never at import
+DEFERRED_MODULES = ("pydantic_ai", "logfire", "google.genai", "ddgs", "product_search")
+ENV = dict(os.environ, GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "offline-benchmark"))
+
+
+def startup_seconds(code: str, cwd: Path) -> float:
+    """Wall time of a fresh interpreter running `code`, from process start to exit"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=cwd, env=ENV, check=True)
+    return time.perf_counter() - start
+
+
+def startup_multiples(runs: int) -> tuple:
+    """(bare interpreter median seconds, {module: (median seconds, median / bare median)})"""
+    bare, times = [], {module: [] for module in TARGETS}
+    # Interleaved, so load on the machine affects the baseline and the targets alike
+    for _ in range(runs):
+        bare.append(startup_seconds("pass", ROOT))
+        for module, cwd in TARGETS.items():
+            times[module].append(startup_seconds(f"import {module}", cwd))
+    bare_median = statistics.median(bare)
+    return bare_median, {module: (statistics.median(t), statistics.median(t) / bare_median) for module, t in times.items()}
+
+
+def import_profile(module: str, cwd: Path) -> tuple:
+    """({direct import of `module`: cumulative us}, every imported module name)"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=cwd, env=ENV,
+                          capture_output=True, text=True, check=True)
+    children = {}
+    pending = {}
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported.add(name.strip())
+        # Nesting is two spaces per level, and a module is listed after its imports
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending[name.strip()] = int(cumulative)
+        elif depth == 0:
+            if name.strip() == module:
+                children = pending
+            pending = {}
+    return children, imported
+
+
+def early_imports(imported: set) -> list:
+    """Deferred modules (or their submodules) in an import list"""
+    return [name for name in DEFERRED_MODULES if any(m == name or m.startswith(name + ".") for m in imported)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="heaviest direct imports to list")
+    parser.add_argument("--budget", type=Path, default=BUDGET_FILE, help="budget JSON written by --save-budget")
+    parser.add_argument("--save-budget", type=Path)
+    parser.add_argument("--headroom", type=float, default=0.5,
+                        help="allowed growth over the measured multiple when saving a budget")
+    args = parser.parse_args()
+
+    budget = json.loads(args.budget.read_text()) if args.budget.exists() and not args.save_budget else {}
+    failures = []
+    bare, multiples = startup_multiples(args.runs)
+    print(f"bare interpreter: median {bare * 1000:.0f}ms over {args.runs} runs")
+    for module, cwd in TARGETS.items():
+        seconds, multiple = multiples[module]
+        children, imported = import_profile(module, cwd)
+
+        print(f"{module}: median {seconds * 1000:.0f}ms, {multiple:.1f}x bare interpreter")
+        for name, us in sorted(children.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {us / 1000:8.1f}ms  {name}")
+
+        early = early_imports(imported)
+        if early:
+            failures.append(f"{module} imports {', '.join(early)} at startup")
+        if module in budget and multiple > budget[module]:
+            failures.append(f"{module} took {multiple:.1f}x bare interpreter startup (budget {budget[module]}x)")
+
+    if args.save_budget:
+        saved = {module: math.ceil(multiple * (1 + args.headroom)) for module, (_, multiple) in multiples.items()}
+        args.save_budget.write_text(json.dumps(saved, indent=2) + "\n")
+        print(f"budget written to {args.save_budget}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("PASS: startup within budget")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-request telemetry overhead with telemetry off, sampled and full.
+
+Each mode runs in its own process (telemetry is configured at import) against
+the in-process shop app with the scripted model and no model latency, so the
+difference between modes is the instrumentation cost itself. Nothing is sent
+to Logfire unless a token is configured.
+
+Usage: python benchmarks/bench_telemetry.py [--requests 1000] [--sample-rate 0.1]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+
+async def child(requests: int) -> dict:
+    import httpx
+    from harness import shop_model
+    from bench_offline import shop_scenarios, run_scenario
+    import ecommerce_ui
+    from task2 import agent
+
+    transport = httpx.ASGITransport(app=ecommerce_ui.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        with agent.override(model=shop_model()):
+            scenarios = shop_scenarios(client)
+            for name in ("send_agent", "send_fast_path", "cart_increase"):
+                # Warm up imports, caches and sessions before timing
+                await run_scenario(scenarios[name], 50, 0)
+                results[name] = await run_scenario(scenarios[name], requests, 0)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.requests))))
+        return
+
+    modes = {
+        "off": {"TELEMETRY": "off"},
+        f"sampled {args.sample_rate:g}": {"TELEMETRY": "on", "TELEMETRY_SAMPLE_RATE": str(args.sample_rate)},
+        "full": {"TELEMETRY": "on", "TELEMETRY_SAMPLE_RATE": "1.0"},
+    }
+    results = {}
+    for mode, env in modes.items():
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", "--requests", str(args.requests)],
+            env={**os.environ, **env}, capture_output=True, text=True, check=True
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    scenarios = list(results["off"])
+    print(f"{'mode':<14} " + " ".join(f"{name + ' p50 ms':>22}" for name in scenarios))
+    for mode, result in results.items():
+        cells = []
+        for name in scenarios:
+            p50, base = result[name]["p50_ms"], results["off"][name]["p50_ms"]
+            cells.append(f"{p50:>10.3f} ({(p50 - base) * 1000:+7.0f}us)")
+        print(f"{mode:<14} " + " ".join(f"{cell:>22}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Per-turn cart post-processing cost: JSON tool returns scanned by /send vs cart deps.
+
+"before" is the old flow: manage_cart json.dumps its action, then /send walks every
+part of every new message, matches ToolReturnPart by class name and json.loads it
+back before applying. "after" is manage_cart applying the action directly through
+RunContext.deps, with nothing left for /send to do.
+
+Usage: python benchmarks/bench_tool_postprocess.py [--calls 1 5 20]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+
+from pydantic_ai.messages import ModelRequest, ModelResponse, UserPromptPart, TextPart, ToolCallPart, ToolReturnPart
+from session_store import new_session
+
+
+def cart_action(i: int) -> dict:
+    return {"action": "add", "product": f"Item {i}", "quantity": 1, "price": 1.25, "emoji": "📦", "custom": False}
+
+
+def turn_messages(calls: int) -> list:
+    """New messages for one turn with `calls` manage_cart calls"""
+    messages = [ModelRequest(parts=[UserPromptPart(content="add some things")])]
+    messages.append(ModelResponse(parts=[
+        ToolCallPart(tool_name="manage_cart", args={"product_name": f"Item {i}", "action": "add"}, tool_call_id=f"c{i}")
+        for i in range(calls)
+    ]))
+    messages.append(ModelRequest(parts=[
+        ToolReturnPart(tool_name="manage_cart", content=json.dumps(cart_action(i)), tool_call_id=f"c{i}")
+        for i in range(calls)
+    ]))
+    messages.append(ModelResponse(parts=[TextPart(content="Done!")]))
+    return messages
+
+
+def before(session_data, calls, new_messages):
+    # Tool side: serialize each action
+    for i in range(calls):
+        json.dumps(cart_action(i))
+    # /send side: scan all new messages and re-parse
+    for msg in new_messages:
+        if hasattr(msg, 'parts'):
+            for part in msg.parts:
+                if part.__class__.__name__ == 'ToolReturnPart':
+                    try:
+                        session_data['cart'].apply(json.loads(part.content), {})
+                    except (json.JSONDecodeError, AttributeError, KeyError):
+                        pass
+
+
+def after(session_data, calls, new_messages):
+    changes = {}
+    for i in range(calls):
+        session_data['cart'].apply(cart_action(i), changes)
+
+
+def per_turn_us(fn, calls, repeat):
+    session_data = new_session()
+    new_messages = turn_messages(calls)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(session_data, calls, new_messages)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, nargs="+", default=[1, 5, 20], help="manage_cart calls per turn")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'calls':>6} {'before us':>10} {'after us':>9}")
+    for calls in args.calls:
+        print(f"{calls:>6} {per_turn_us(before, calls, args.repeat):>10.1f} {per_turn_us(after, calls, args.repeat):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Throughput scaling of server.py from 1 to N uvicorn workers.
+
+Starts server.py on a local port for each worker count, then drives it from
+several client processes with a mix of model-free requests (fast-path /send,
+/messages, /cart/increase, /cart/decrease), so the numbers are server overhead
+only. Each client session is its own cookie. The server is stopped with SIGTERM
+to exercise the graceful shutdown path.
+
+Usage: python benchmarks/bench_workers.py [--workers 1 2 4] [--duration 10] [--clients 4] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+TASK2 = Path(__file__).resolve().parent.parent / "task2"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+async def client_loop(base_url: str, client_id: int, concurrency: int, duration: float) -> tuple:
+    import httpx
+    done = errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def user(i):
+            nonlocal done, errors
+            rng = random.Random(i)
+            headers = {"Cookie": f"session_id=worker-bench-{client_id}-{i}"}
+            await client.post("/send", data={"message": "add 5 salt"}, headers=headers)
+            while time.perf_counter() < deadline:
+                op = rng.random()
+                if op < 0.2:
+                    response = await client.post("/send", data={"message": "add 1 salt"}, headers=headers)
+                elif op < 0.6:
+                    response = await client.get("/messages", headers=headers)
+                elif op < 0.8:
+                    response = await client.post("/cart/increase/Salt", headers=headers)
+                else:
+                    response = await client.post("/cart/decrease/Salt", headers=headers)
+                done += 1
+                errors += response.status_code != 200
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return done, errors
+
+
+def run_client(args_tuple) -> tuple:
+    return asyncio.run(client_loop(*args_tuple))
+
+
+def bench(workers: int, args) -> tuple:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "offline-benchmark"), SHOP_STREAMING="0")
+        server = subprocess.Popen(
+            [sys.executable, "server.py", "--workers", str(workers), "--port", str(port),
+             "--store", "sqlite:" + os.path.join(tmp, "sessions.db"),
+             "--lock-file", os.path.join(tmp, "sessions.lock")],
+            cwd=TASK2, env=env
+        )
+        try:
+            wait_for_port(port)
+            time.sleep(1)  # let every worker finish importing
+            jobs = [(f"http://127.0.0.1:{port}", c, args.concurrency, args.duration) for c in range(args.clients)]
+            start = time.perf_counter()
+            with multiprocessing.Pool(args.clients) as pool:
+                results = pool.map(run_client, jobs)
+            elapsed = time.perf_counter() - start
+        finally:
+            server.send_signal(signal.SIGTERM)
+            exit_code = server.wait(timeout=60)
+    done = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    return done / elapsed, errors, exit_code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per worker count")
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=64, help="virtual users per client process")
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'req/s':>9} {'speedup':>8} {'errors':>7} {'shutdown':>9}")
+    base = None
+    for workers in args.workers:
+        rps, errors, exit_code = bench(workers, args)
+        base = base or rps
+        print(f"{workers:>7} {rps:>9.0f} {rps / base:>7.2f}x {errors:>7} {'clean' if exit_code in (0, -signal.SIGTERM) else exit_code:>9}")
+
+
+if __name__ == "__main__":
+    main()
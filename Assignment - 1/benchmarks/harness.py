@@ -0,0 +1,151 @@
+"""
+Shared pieces for the offline benchmarks: scripted models, latency stats and allocation tracking.
+
+The scripted models stand in for Gemini through pydantic-ai's FunctionModel, so
+what gets measured is our own overhead plus a fixed, configurable model latency.
+"""
+import asyncio
+import os
+import re
+import statistics
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "task2"))
+sys.path.insert(0, str(ROOT / "task1"))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+from pydantic_ai.models.function import FunctionModel, AgentInfo, DeltaToolCall
+
+# Model round trips made by the scripted models, for comparing request counts
+model_stats = {"requests": 0}
+
+
+def last_user_prompt(messages) -> str:
+    for message in reversed(messages):
+        for part in getattr(message, "parts", []):
+            if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+                return part.content
+    return ""
+
+
+def current_turn(messages) -> list:
+    """Messages from the latest user prompt on"""
+    for i in range(len(messages) - 1, -1, -1):
+        if any(isinstance(p, UserPromptPart) for p in getattr(messages[i], "parts", [])):
+            return messages[i:]
+    return messages
+
+
+def streamed(respond):
+    """stream_function for FunctionModel replaying `respond`'s response: text word by word, then tool calls"""
+    async def stream(messages, info: AgentInfo):
+        response = await respond(messages, info)
+        for i, part in enumerate(response.parts):
+            if isinstance(part, TextPart):
+                for word in re.findall(r"\S+\s*", part.content):
+                    yield word
+            elif isinstance(part, ToolCallPart):
+                yield {i: DeltaToolCall(name=part.tool_name, json_args=part.args_as_json_str(), tool_call_id=part.tool_call_id)}
+
+    return stream
+
+
+def shop_model(latency: float = 0.0, tool_mode: str = "parallel") -> FunctionModel:
+    """
+    Scripted shopping model.
+
+    Adds one of each catalog product named in the user's message, then answers
+    with a short confirmation once the tools have returned. `tool_mode` picks
+    how the adds are issued:
+      - "parallel": one manage_cart call per product, all in the first response
+      - "per_item": one manage_cart call per response, a model round trip each
+      - "bulk": a single manage_cart_bulk call with every product
+    """
+    from task2 import catalog
+
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        model_stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        words = re.findall(r"[a-z]+", last_user_prompt(messages).casefold())
+        products = sorted({p["name"] for p in map(catalog.match, words) if p})
+        if any(isinstance(p, ToolReturnPart) for p in messages[-1].parts):
+            if tool_mode == "per_item":
+                # Products already called for since the user prompt are done
+                called = {part.args_as_dict()["product_name"] for message in current_turn(messages)
+                          for part in getattr(message, "parts", []) if isinstance(part, ToolCallPart)}
+                products = [name for name in products if name not in called]
+            if tool_mode != "per_item" or not products:
+                return ModelResponse(parts=[TextPart(content="Done! Your cart has been updated.")])
+        if not products:
+            return ModelResponse(parts=[TextPart(content="We sell: " + ", ".join(catalog.names[:8]) + ".")])
+        adds = [{"product_name": name, "action": "add", "quantity": 1} for name in products]
+        if tool_mode == "bulk":
+            return ModelResponse(parts=[ToolCallPart(tool_name="manage_cart_bulk", args={"items": adds})])
+        if tool_mode == "per_item":
+            adds = adds[:1]
+        return ModelResponse(parts=[ToolCallPart(tool_name="manage_cart", args=args) for args in adds])
+
+    return FunctionModel(respond, stream_function=streamed(respond))
+
+
+def research_model(latency: float = 0.0, searches: int = 2, fan_out: bool = False) -> FunctionModel:
+    """
+    Scripted research model.
+
+    Requests `searches` web_search calls in one step (or one web_search_many
+    call with that many queries if `fan_out`), then returns a ResearchOutput
+    built from the URLs in the tool results.
+    """
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        model_stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        returns = [p for p in messages[-1].parts if isinstance(p, ToolReturnPart)]
+        if not returns:
+            query = last_user_prompt(messages)
+            queries = [f"{query} {i}" if i else query for i in range(searches)]
+            if fan_out:
+                return ModelResponse(parts=[ToolCallPart(tool_name="web_search_many", args={"queries": queries})])
+            return ModelResponse(parts=[ToolCallPart(tool_name="web_search", args={"query": q}) for q in queries])
+        sources = re.findall(r"URL: (\S+)", "\n".join(str(p.content) for p in returns))
+        output = {"summary": f"Summary of {len(sources)} results.",
+                  "key_facts": [f"Fact {i + 1}" for i in range(3)], "sources": sources[:5]}
+        return ModelResponse(parts=[ToolCallPart(tool_name=info.output_tools[0].name, args=output)])
+
+    return FunctionModel(respond)
+
+
+def percentile(ordered: list, pct: float) -> float:
+    return ordered[min(int(len(ordered) * pct / 100), len(ordered) - 1)]
+
+
+def latency_summary(latencies: list, elapsed: float) -> dict:
+    """p50/p95/p99 in milliseconds and throughput for one scenario"""
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+    }
+
+
+async def allocations_per_call(fn, n: int) -> float:
+    """Mean bytes allocated at peak while running `await fn(i)`, traced in a separate pass"""
+    tracemalloc.start()
+    total = 0
+    try:
+        for i in range(n):
+            base, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await fn(i)
+            total += tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return total / n if n else 0.0
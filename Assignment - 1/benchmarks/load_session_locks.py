@@ -0,0 +1,89 @@
+"""
+Load test: concurrent /send and /cart/increase requests for one session must not lose updates.
+
+Runs the app in-process with a scripted model (no Gemini calls) that adds one
+Salt per /send after a short simulated latency. Exits non-zero if the final
+cart quantity or chat length doesn't match the number of requests.
+
+Usage: python benchmarks/load_session_locks.py [--sends 50] [--clicks 50] [--store sqlite]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+import httpx
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+from pydantic_ai.models.function import FunctionModel, AgentInfo
+
+
+def scripted_model(latency: float):
+    """Model that calls manage_cart(add Salt) once, then confirms"""
+    async def respond(messages, info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(latency)
+        if any(isinstance(p, ToolReturnPart) for p in messages[-1].parts):
+            return ModelResponse(parts=[TextPart(content="Added one salt to your cart.")])
+        return ModelResponse(parts=[ToolCallPart(
+            tool_name="manage_cart", args={"product_name": "Salt", "action": "add", "quantity": 1}
+        )])
+    return respond
+
+
+async def run(args):
+    import ecommerce_ui
+    from task2 import agent
+    from session_locks import lock_stats
+
+    transport = httpx.ASGITransport(app=ecommerce_ui.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", cookies={"session_id": "load-test"}) as client:
+        with agent.override(model=FunctionModel(scripted_model(args.latency))):
+            # Seed the cart so /cart/increase has something to increment
+            await client.post("/send", data={"message": "add 1 salt"})
+
+            start = time.perf_counter()
+            requests = [client.post("/send", data={"message": "I'd like another salt please"}) for _ in range(args.sends)]
+            requests += [client.post("/cart/increase/Salt") for _ in range(args.clicks)]
+            responses = await asyncio.gather(*requests)
+            elapsed = time.perf_counter() - start
+
+    failed = [r.status_code for r in responses if r.status_code != 200]
+    session_data = await ecommerce_ui.get_session_data("load-test")
+    expected_qty = 1 + args.sends + args.clicks
+    line = session_data['cart'].get('Salt')
+    actual_qty = line.quantity if line else 0
+    expected_messages = 2 * (1 + args.sends)
+    actual_messages = len(session_data['messages'])
+
+    print(f"{len(responses)} concurrent requests in {elapsed:.2f}s ({len(responses) / elapsed:.1f} req/s), {len(failed)} failed")
+    print(f"cart quantity: {actual_qty} (expected {expected_qty})")
+    print(f"chat messages: {actual_messages} (expected {expected_messages})")
+    print(f"max queue depth: {lock_stats['max_queue_depth']}, "
+          f"max wait: {lock_stats['max_wait_seconds'] * 1000:.1f}ms, "
+          f"mean wait: {lock_stats['wait_seconds_total'] / max(lock_stats['acquired'], 1) * 1000:.1f}ms")
+    return not failed and actual_qty == expected_qty and actual_messages == expected_messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sends", type=int, default=50, help="concurrent /send requests")
+    parser.add_argument("--clicks", type=int, default=50, help="concurrent /cart/increase requests")
+    parser.add_argument("--latency", type=float, default=0.01, help="simulated model latency (seconds)")
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.store == "sqlite":
+            os.environ["SESSION_STORE"] = "sqlite:" + os.path.join(tmp, "sessions.db")
+        ok = asyncio.run(run(args))
+    print("PASS: no lost updates" if ok else "FAIL: updates were lost")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Load generator: N concurrent virtual shoppers against the in-process app.
+
+Each virtual user has its own session cookie and loops over a weighted mix of
+/send, /messages, /cart/increase and /cart/decrease with a short think time,
+with the scripted shop model (benchmarks/harness.py) in place of Gemini. Runs
+one step per --users value and reports throughput, per-endpoint latency
+histograms and server memory growth, to show where a single worker degrades.
+
+Usage:
+    python benchmarks/load_shoppers.py --users 100 500 1000 --duration 10 \\
+        --mix send=0.2,messages=0.4,increase=0.2,decrease=0.2 --latency 0.2
+"""
+import argparse
+import asyncio
+import gc
+import random
+import resource
+import time
+from collections import defaultdict
+
+from harness import shop_model, latency_summary
+
+import httpx
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf")]
+SEND_MESSAGES = ["add 1 salt", "I'd like some soap please", "remove salt", "what do you sell?"]
+
+
+def parse_mix(spec: str) -> dict:
+    """"send=0.2,messages=0.4,..." -> {"send": 0.2, ...}"""
+    mix = {}
+    for item in spec.split(","):
+        name, weight = item.split("=")
+        if name not in ("send", "messages", "increase", "decrease"):
+            raise ValueError(f"Unknown endpoint in mix: {name!r}")
+        mix[name] = float(weight)
+    return mix
+
+
+def rss_bytes() -> int:
+    """Current resident set size (Linux), falling back to the peak"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def virtual_user(client, user_id: int, mix: dict, deadline: float, think: float, latencies, errors):
+    rng = random.Random(user_id)
+    headers = {"Cookie": f"session_id=shopper-{user_id}"}
+    names, weights = list(mix), list(mix.values())
+    # Every shopper starts with something in the cart so +/- have a line to act on
+    await client.post("/send", data={"message": "add 2 salt"}, headers=headers)
+    while time.perf_counter() < deadline:
+        endpoint = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            if endpoint == "send":
+                response = await client.post("/send", data={"message": rng.choice(SEND_MESSAGES)}, headers=headers)
+            elif endpoint == "messages":
+                response = await client.get("/messages", headers=headers)
+            else:
+                response = await client.post(f"/cart/{endpoint}/Salt", headers=headers)
+            if response.status_code != 200:
+                errors[endpoint] += 1
+        except httpx.HTTPError:
+            errors[endpoint] += 1
+        latencies[endpoint].append(time.perf_counter() - start)
+        if think:
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+
+
+def histogram(latencies: list) -> str:
+    counts = [0] * len(BUCKETS_MS)
+    for latency in latencies:
+        ms = latency * 1000
+        counts[next(i for i, bound in enumerate(BUCKETS_MS) if ms <= bound)] += 1
+    labels = [f"<={b:g}ms" if b != float("inf") else f">{BUCKETS_MS[-2]:g}ms" for b in BUCKETS_MS]
+    return "  ".join(f"{label}:{count}" for label, count in zip(labels, counts) if count)
+
+
+async def run_step(app, users: int, args, mix: dict) -> dict:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", limits=limits, timeout=60) as client:
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(
+            virtual_user(client, args.user_offset + i, mix, deadline, args.think, latencies, errors)
+            for i in range(users)
+        ))
+        elapsed = time.perf_counter() - start
+    args.user_offset += users
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[50, 200, 1000], help="concurrent shoppers per step")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per step")
+    parser.add_argument("--mix", default="send=0.2,messages=0.4,increase=0.2,decrease=0.2")
+    parser.add_argument("--think", type=float, default=0.5, help="mean think time between a user's requests (seconds)")
+    parser.add_argument("--latency", type=float, default=0.2, help="simulated model latency (seconds)")
+    args = parser.parse_args()
+    args.user_offset = 0
+    mix = parse_mix(args.mix)
+
+    import ecommerce_ui
+    from task2 import agent
+
+    gc.collect()
+    baseline_rss = rss_bytes()
+    print(f"mix: {mix}, think {args.think}s, model latency {args.latency}s, baseline RSS {baseline_rss / 2**20:.1f} MiB")
+    with agent.override(model=shop_model(args.latency)):
+        for users in args.users:
+            step = asyncio.run(run_step(ecommerce_ui.app, users, args, mix))
+            gc.collect()
+            all_latencies = [l for ls in step["latencies"].values() for l in ls]
+            overall = latency_summary(all_latencies, step["elapsed"])
+            growth = rss_bytes() - baseline_rss
+            print(f"\n== {users} users: {overall['rps']} req/s, p50 {overall['p50_ms']}ms, "
+                  f"p95 {overall['p95_ms']}ms, p99 {overall['p99_ms']}ms, "
+                  f"{sum(step['errors'].values())} errors, RSS +{growth / 2**20:.1f} MiB "
+                  f"({growth / max(args.user_offset, 1) / 1024:.1f} KiB per session so far)")
+            for endpoint, latencies in sorted(step["latencies"].items()):
+                summary = latency_summary(latencies, step["elapsed"])
+                print(f"  {endpoint:<9} n={summary['requests']:<6} p50={summary['p50_ms']:.1f}ms "
+                      f"p95={summary['p95_ms']:.1f}ms errors={step['errors'][endpoint]}")
+                print(f"            {histogram(latencies)}")
+
+
+if __name__ == "__main__":
+    main()
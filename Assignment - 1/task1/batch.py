@@ -0,0 +1,163 @@
+"""
+Batch research mode: run a file of queries through research_agent.
+
+Usage:
+    python batch.py queries.jsonl -o results.jsonl --concurrency 4 --rate 2
+
+Queries come from JSONL (one {"id": ..., "query": ...} object or bare string per
+line) or CSV (a "query" column and optional "id" column). Results are appended
+to the output JSONL as each query finishes; re-running with the same output file
+skips queries that already succeeded, so a crashed batch can be resumed.
+Answers come from the persistent response cache when a query was already
+researched; pass --no-cache to always run the agent.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import statistics
+import time
+from pathlib import Path
+from task1 import run_research, get_response_cache
+
+
+def load_queries(path: Path) -> list:
+    """Read (id, query) pairs from a JSONL or CSV file"""
+    queries = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.suffix.lower() == ".csv":
+            for i, row in enumerate(csv.DictReader(f)):
+                queries.append((str(row.get("id") or i), row["query"]))
+        else:
+            for i, line in enumerate(f):
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if isinstance(item, str):
+                    queries.append((str(i), item))
+                else:
+                    queries.append((str(item.get("id", i)), item["query"]))
+    return queries
+
+
+def completed_ids(path: Path) -> set:
+    """Ids already answered successfully in an existing output file"""
+    done = set()
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial line from a crash
+            if record.get("error") is None:
+                done.add(record["id"])
+    return done
+
+
+class RateLimiter:
+    """Spaces out run starts to at most `rate` per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def run_batch(queries: list, output: Path, concurrency: int, rate: float, use_cache: bool = True):
+    """Run queries with bounded concurrency, appending results as they finish.
+
+    Returns (latencies in seconds, number of failed queries, per-run search stats).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+    latencies = []
+    failures = 0
+    search_stats = []
+
+    # A crash can leave a partial last line; start new records on a fresh line
+    needs_newline = output.exists() and output.stat().st_size and not output.read_bytes().endswith(b"\n")
+    with open(output, "a", encoding="utf-8") as out:
+        if needs_newline:
+            out.write("\n")
+
+        async def run_one(query_id, query):
+            nonlocal failures
+            async with semaphore:
+                await limiter.wait()
+                start = time.perf_counter()
+                record = {"id": query_id, "query": query}
+                stats = {}
+                try:
+                    result = await run_research(query, use_cache=use_cache, stats=stats)
+                    record["output"] = result.model_dump()
+                    record["error"] = None
+                except Exception as e:
+                    record["output"] = None
+                    record["error"] = f"{type(e).__name__}: {e}"
+                    failures += 1
+                record["latency_s"] = round(time.perf_counter() - start, 3)
+                record["search_s"] = round(stats.get("search_seconds", 0.0), 3)
+                record["search_timeouts"] = stats.get("timeouts", 0)
+                latencies.append(record["latency_s"])
+                search_stats.append(stats)
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                print(f"[{len(latencies)}/{len(queries)}] {query_id}: {'ok' if record['error'] is None else record['error']} ({record['latency_s']}s)")
+
+        await asyncio.gather(*(run_one(query_id, query) for query_id, query in queries))
+    return latencies, failures, search_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a file of research queries through research_agent")
+    parser.add_argument("queries", type=Path, help="JSONL or CSV file of queries")
+    parser.add_argument("-o", "--output", type=Path, default=Path("results.jsonl"))
+    parser.add_argument("--concurrency", type=int, default=4, help="max agent runs in flight")
+    parser.add_argument("--rate", type=float, default=0, help="max runs started per second (0 = unlimited)")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the persistent response cache")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    done = completed_ids(args.output)
+    pending = [(query_id, query) for query_id, query in queries if query_id not in done]
+    if done:
+        print(f"Resuming: {len(queries) - len(pending)} of {len(queries)} queries already done")
+
+    start = time.perf_counter()
+    latencies, failures, search_stats = asyncio.run(run_batch(pending, args.output, args.concurrency, args.rate, not args.no_cache))
+    elapsed = time.perf_counter() - start
+
+    print("Batch summary:")
+    print(f"  completed: {len(latencies) - failures}, failed: {failures}, skipped: {len(queries) - len(pending)}")
+    print(f"  wall time: {elapsed:.1f}s, throughput: {len(latencies) / elapsed if elapsed else 0:.2f} queries/s")
+    if latencies:
+        ordered = sorted(latencies)
+        p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+        print(f"  latency: p50 {statistics.median(ordered):.2f}s, p95 {p95:.2f}s, max {ordered[-1]:.2f}s")
+    searched = [s for s in search_stats if s.get("searches")]
+    if searched:
+        wall = sum(s["wall_seconds"] for s in searched)
+        search = sum(s["search_seconds"] for s in searched)
+        print(f"  searches: {sum(s['searches'] for s in searched)} in {len(searched)} runs, "
+              f"{sum(s['timeouts'] for s in searched)} timed out; summed search time {search:.1f}s "
+              f"vs run wall time {wall:.1f}s (ratio {search / wall if wall else 0:.1f})")
+    if not args.no_cache:
+        stats = get_response_cache().stats()
+        print(f"  response cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, {stats['evictions']} evicted")
+
+
+if __name__ == "__main__":
+    main()
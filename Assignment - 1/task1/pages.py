@@ -0,0 +1,396 @@
+import asyncio
+import math
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+from html.parser import HTMLParser
+
+# Running totals for the current process
+page_stats = {"fetched": 0, "cache_hits": 0, "failed": 0, "timeouts": 0, "duplicates": 0}
+
+# Words too common to help rank passages
+STOPWORDS = frozenset(
+    "a an the about of on in for to and or is are was were be been it its this that these those "
+    "with as by at from what which who how why when where".split()
+)
+
+
+def tokenize(text: str) -> list:
+    return re.findall(r"[^\W_]+", text.casefold())
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the title and block-level text, skipping scripts, navigation and other chrome"""
+
+    SKIP = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "template", "iframe", "button"}
+    MAIN = {"main", "article"}
+    BLOCK = {"p", "div", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "section", "br", "tr", "td",
+             "blockquote", "pre", "table", "dd", "dt", "figcaption"} | MAIN
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.blocks = []  # (text, inside <main>/<article>)
+        self._buffer = []
+        self._skip = 0
+        self._main = 0
+        self._in_title = False
+
+    def _flush(self):
+        text = " ".join("".join(self._buffer).split())
+        if text:
+            self.blocks.append((text, self._main > 0))
+        self._buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        if tag in self.BLOCK:
+            self._flush()
+        if tag in self.MAIN:
+            self._main += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCK:
+            self._flush()
+        if tag in self.SKIP:
+            self._skip = max(self._skip - 1, 0)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in self.MAIN:
+            self._main = max(self._main - 1, 0)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self._buffer.append(data)
+
+
+def extract_text(html: str, min_words: int = 5) -> tuple:
+    """
+    (title, paragraphs) of a page's main text.
+
+    Text inside <main>/<article> is preferred when there is enough of it;
+    blocks shorter than `min_words` (menus, buttons, bylines) are dropped.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    parser._flush()
+    blocks = [(text, in_main) for text, in_main in parser.blocks if len(text.split()) >= min_words]
+    main = [text for text, in_main in blocks if in_main]
+    paragraphs = main if sum(len(text.split()) for text in main) >= 50 else [text for text, _ in blocks]
+    return " ".join(parser.title.split()), paragraphs
+
+
+# MinHash over word 5-gram shingles: the fraction of matching signature slots
+# estimates the Jaccard similarity of two pages' shingle sets
+SHINGLE_WORDS = 5
+MINHASH_PERMUTATIONS = 64
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(MINHASH_PERMUTATIONS)]
+
+
+def minhash(words: list, max_words: int = 2000) -> tuple:
+    """MinHash signature of the page's first `max_words` words"""
+    words = words[:max_words]
+    shingles = {zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode())
+                for i in range(max(len(words) - SHINGLE_WORDS + 1, 1))}
+    return tuple(min((a * h + b) % _PRIME for h in shingles) for a, b in _PERMUTATIONS)
+
+
+def similarity(a: tuple, b: tuple) -> float:
+    return sum(x == y for x, y in zip(a, b)) / MINHASH_PERMUTATIONS if a and b else 0.0
+
+
+def chunk_passages(paragraphs: list, target_words: int = 100) -> list:
+    """Merge short paragraphs and split long ones into passages of about `target_words` words"""
+    passages = []
+    current = []
+    for paragraph in paragraphs:
+        words = paragraph.split()
+        while len(words) > target_words * 3 // 2:
+            if current:
+                passages.append(" ".join(current))
+                current = []
+            passages.append(" ".join(words[:target_words]))
+            words = words[target_words:]
+        current += words
+        if len(current) >= target_words * 2 // 3:
+            passages.append(" ".join(current))
+            current = []
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def rank_passages(query: str, passages: list, k1: float = 1.2, b: float = 0.75) -> list:
+    """BM25 scores of each passage text for the query"""
+    terms = {t for t in tokenize(query) if t not in STOPWORDS} or set(tokenize(query))
+    docs = [Counter(tokenize(text)) for text in passages]
+    if not docs:
+        return []
+    avgdl = sum(sum(doc.values()) for doc in docs) / len(docs) or 1.0
+    df = {t: sum(1 for doc in docs if t in doc) for t in terms}
+    idf = {t: math.log1p((len(docs) - df[t] + 0.5) / (df[t] + 0.5)) for t in terms}
+    scores = []
+    for doc in docs:
+        norm = k1 * (1 - b + b * sum(doc.values()) / avgdl)
+        scores.append(sum(idf[t] * doc[t] * (k1 + 1) / (doc[t] + norm) for t in terms if t in doc))
+    return scores
+
+
+def format_passages(passages: list) -> str:
+    """Format ranked passages the way the search tools return them to the model"""
+    return "\n".join(f"Passage from {p['url']} ({p['title'] or 'untitled'}):\n{p['text']}\n" for p in passages)
+
+
+class PageFetcher:
+    """Interface for page fetchers: HTML for a URL, or None if it can't be fetched"""
+
+    async def fetch(self, url: str):
+        raise NotImplementedError
+
+
+class HttpFetcher(PageFetcher):
+    """
+    Pooled async HTTP fetcher (httpx).
+
+    One client per event loop keeps connections alive across pages and runs.
+    The client is closed on its own loop, when that loop shuts down or the
+    fetcher moves to another loop. Non-HTML responses are skipped and bodies
+    are cut off at `max_bytes`.
+    """
+
+    def __init__(self, max_connections: int = 8, max_bytes: int = 2_000_000):
+        self.max_connections = max_connections
+        self.max_bytes = max_bytes
+        self._client = None
+        self._client_loop = None
+        self._closer = None
+
+    def _get_client(self):
+        loop = asyncio.get_running_loop()
+        if self._client_loop is not loop:
+            if self._closer is not None and not self._client_loop.is_closed():
+                self._client_loop.call_soon_threadsafe(self._closer.cancel)
+            import httpx
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+                headers={"User-Agent": "Mozilla/5.0 (compatible; research-agent)"},
+            )
+            self._client_loop = loop
+            # asyncio.run cancels leftover tasks before closing the loop, which closes the client in time
+            self._closer = loop.create_task(self._close_when_cancelled(self._client))
+        return self._client
+
+    @staticmethod
+    async def _close_when_cancelled(client):
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            await client.aclose()
+
+    async def fetch(self, url: str):
+        import httpx
+        try:
+            async with self._get_client().stream("GET", url) as response:
+                content_type = response.headers.get("content-type", "")
+                if response.status_code != 200 or not ("html" in content_type or content_type.startswith("text/")):
+                    return None
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        break
+                return body.decode(response.encoding or "utf-8", errors="replace")
+        except (httpx.HTTPError, httpx.InvalidURL, httpx.UnsupportedProtocol, ValueError) as e:
+            # Includes malformed hrefs from search results (UnicodeError is a ValueError): skip the page
+            import logfire
+            logfire.warn('Page fetch failed', url=url, error=repr(e))
+            return None
+
+
+class PageCache:
+    """
+    Persistent SQLite cache of extracted pages keyed on URL.
+
+    Stores the title and paragraphs rather than raw HTML. Entries expire after
+    `ttl_seconds`; past `max_entries` the oldest fetches are evicted. The file
+    is opened on first use.
+    """
+
+    def __init__(self, path: str = "page_cache.db", ttl_seconds: float = 7 * 86400, max_entries: int = 5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " url TEXT PRIMARY KEY,"
+                " title TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " fetched REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_fetched ON pages (fetched)")
+        return self._conn
+
+    def get(self, url: str):
+        """(title, paragraphs) for the URL, or None on a miss or expired entry"""
+        with self._lock:
+            row = self._connect().execute("SELECT title, text, fetched FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or time.time() - row[2] > self.ttl_seconds:
+            return None
+        return row[0], row[1].split("\n\n") if row[1] else []
+
+    def put(self, url: str, title: str, paragraphs: list) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (url, title, text, fetched) VALUES (?, ?, ?, ?)",
+                (url, title, "\n\n".join(paragraphs), time.time())
+            )
+            count = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute("DELETE FROM pages WHERE url IN (SELECT url FROM pages ORDER BY fetched LIMIT ?)",
+                             (count - self.max_entries,))
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class PageService:
+    """
+    Turns search results into the most relevant passages from the result pages.
+
+    Pages are fetched concurrently (at most `max_concurrency` at once across
+    all runs, `timeout` seconds each) and extracted, deduplicated and chunked as
+    they arrive. Near-duplicate pages (MinHash similarity >= `duplicate_threshold`)
+    are dropped in favour of the higher-ranked result. Once every page is in or
+    has timed out, the passages are ranked with BM25 against the query, which
+    needs term statistics over all of them.
+    """
+
+    def __init__(self, fetcher: PageFetcher, cache: PageCache = None, max_concurrency: int = 8,
+                 timeout: float = 8.0, duplicate_threshold: float = 0.8):
+        self.fetcher = fetcher
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.duplicate_threshold = duplicate_threshold
+        self._limit = None
+        self._limit_loop = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._limit_loop is not loop:
+            self._limit, self._limit_loop = asyncio.Semaphore(self.max_concurrency), loop
+        return self._limit
+
+    async def _load(self, url: str):
+        """(title, paragraphs, signature) for one page, or None"""
+        # The cache is SQLite; keep its reads and writes off the event loop too
+        cached = await asyncio.to_thread(self.cache.get, url) if self.cache else None
+        if cached is not None:
+            page_stats["cache_hits"] += 1
+            title, paragraphs = cached
+        else:
+            async with self._semaphore():
+                try:
+                    html = await asyncio.wait_for(self.fetcher.fetch(url), self.timeout)
+                except asyncio.TimeoutError:
+                    page_stats["timeouts"] += 1
+                    return None
+            if not html:
+                page_stats["failed"] += 1
+                if self.cache:
+                    await asyncio.to_thread(self.cache.put, url, "", [])  # don't retry dead links until the entry expires
+                return None
+            page_stats["fetched"] += 1
+            # Parsing is CPU-bound; keep it off the event loop while other pages download
+            title, paragraphs = await asyncio.to_thread(extract_text, html)
+            if self.cache:
+                await asyncio.to_thread(self.cache.put, url, title, paragraphs)
+        if not paragraphs:
+            return None
+        signature = await asyncio.to_thread(minhash, " ".join(paragraphs).casefold().split())
+        return title, paragraphs, signature
+
+    @staticmethod
+    async def _with_rank(rank: int, load) -> tuple:
+        return rank, await load
+
+    async def passages(self, query: str, results: list, top_k: int = 6, max_per_page: int = 3) -> list:
+        """Top passages ({url, title, text, score}) from the pages behind `results`, best first"""
+        urls = list(dict.fromkeys(r["href"] for r in results if r.get("href", "").startswith(("http://", "https://"))))
+        loads = [asyncio.ensure_future(self._with_rank(rank, self._load(url))) for rank, url in enumerate(urls)]
+
+        kept = {}  # search-result rank -> (title, signature, passages)
+        try:
+            for next_page in asyncio.as_completed(loads):
+                rank, page = await next_page
+                if page is None:
+                    continue
+                title, paragraphs, signature = page
+                similar = [other for other, (_, seen, _) in kept.items()
+                           if similarity(signature, seen) >= self.duplicate_threshold]
+                # Duplicates resolve to the higher-ranked result, whichever page arrived first
+                if any(other < rank for other in similar):
+                    page_stats["duplicates"] += 1
+                    continue
+                for other in similar:
+                    page_stats["duplicates"] += 1
+                    del kept[other]
+                kept[rank] = (title, signature, chunk_passages(paragraphs))
+        finally:
+            for load in loads:
+                load.cancel()  # only still-running loads, if the run itself was cancelled
+
+        candidates = [(urls[rank], title, text) for rank, (title, _, texts) in sorted(kept.items()) for text in texts]
+        scores = rank_passages(query, [text for _, _, text in candidates])
+        ranked = sorted(range(len(candidates)), key=lambda i: -scores[i])
+        selected, per_page = [], Counter()
+        for i in ranked:
+            url, title, text = candidates[i]
+            if scores[i] <= 0 or len(selected) >= top_k:
+                break
+            if per_page[url] >= max_per_page:
+                continue
+            per_page[url] += 1
+            selected.append({"url": url, "title": title, "text": text, "score": round(scores[i], 3)})
+        return selected
+
+
+def create_page_service(spec: str = "http", cache_path: str = None, max_concurrency: int = 8,
+                        timeout: float = 8.0):
+    """
+    Build the page stage from a fetcher spec.
+
+    - "http" (default): pooled httpx fetcher
+    - "off": no page fetching; the search tools return snippets only (None)
+    """
+    if spec == "off":
+        return None
+    if spec == "http":
+        cache = PageCache(cache_path) if cache_path else None
+        return PageService(HttpFetcher(max_connections=max_concurrency), cache, max_concurrency, timeout)
+    raise ValueError(f"Unknown page fetcher: {spec!r}")
@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+# Kept out of task1.py: defining a pydantic model loads pydantic's plugins, and
+# logfire registers one, so importing this module imports logfire
+
+
+class ResearchOutput(BaseModel):
+    summary: str = Field(description="A concise summary of the research findings")
+    key_facts: list[str] = Field(description="A list of 3-5 key facts extracted from the research")
+    sources: list[str] = Field(description="List of source URLs or references used")
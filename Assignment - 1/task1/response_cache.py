@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+def response_cache_key(query: str) -> str:
+    """
+    Case-folded query with whitespace collapsed, nothing else.
+
+    Word order, repeated words, single letters and symbols all stay: "C++
+    tutorial" and "C tutorial", or "vitamin A benefits" and "vitamin
+    benefits", are different questions.
+    """
+    return " ".join(query.casefold().split())
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of research_agent outputs keyed on the normalized query.
+
+    Entries expire after `ttl_seconds`. Once more than `max_entries` are
+    stored, the least recently used ones are evicted. Hit/miss/eviction counts
+    are kept for the current process.
+    """
+
+    def __init__(self, path: str = "research_cache.db", ttl_seconds: float = 86400, max_entries: int = 1000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " query TEXT NOT NULL,"
+            " output TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, query: str):
+        """Cached output dict for the query, or None on a miss or expired entry"""
+        key = response_cache_key(query)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT output, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, query: str, output: dict) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO responses (key, query, output, created, last_used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET query = excluded.query, output = excluded.output, "
+                "created = excluded.created, last_used = excluded.last_used",
+                (response_cache_key(query), query, json.dumps(output), now, now)
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                self.evictions += cursor.rowcount
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": round(self.hit_rate, 3), "entries": len(self)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+
+# Set by run_research to a dict that collects this run's search count, timeouts and summed search time
+run_search_stats = ContextVar("run_search_stats", default=None)
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold, drop punctuation and collapse whitespace so near-identical queries share a cache entry"""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.casefold()).split())
+
+
+def format_results(results: list) -> str:
+    """Format search results the way the web_search tool returns them to the model"""
+    return "\n".join(f"Title: {r['title']}\nSnippet: {r['body']}\nURL: {r['href']}\n" for r in results)
+
+
+class SearchBackend:
+    """Interface for search backends. Results are dicts with title, body and href."""
+
+    async def search(self, query: str, max_results: int) -> list:
+        raise NotImplementedError
+
+
+class DDGSBackend(SearchBackend):
+    """
+    DuckDuckGo via ddgs, with a pool of reusable clients.
+
+    DDGS is blocking, so each search runs in a worker thread with a client
+    checked out of the pool; at most `pool_size` searches run at once.
+    """
+
+    def __init__(self, pool_size: int = 4):
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        with self._lock:
+            if self._pool.empty() and self._created < self.pool_size:
+                from ddgs import DDGS
+                self._created += 1
+                return DDGS()
+        return self._pool.get()
+
+    def _search_sync(self, query: str, max_results: int) -> list:
+        client = self._checkout()
+        try:
+            return list(client.text(query, max_results=max_results) or [])
+        finally:
+            self._pool.put(client)
+
+    async def search(self, query: str, max_results: int) -> list:
+        return await asyncio.to_thread(self._search_sync, query, max_results)
+
+
+class FixtureBackend(SearchBackend):
+    """
+    Local stand-in for tests and benchmarks.
+
+    Serves canned results from a JSON file ({query: [results]}, matched on the
+    normalized query) and synthesizes deterministic results for anything else,
+    after an optional simulated latency.
+    """
+
+    def __init__(self, path: str = None, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.fixtures = {}
+        if path:
+            with open(path, encoding="utf-8") as f:
+                self.fixtures = {normalize_query(q): results for q, results in json.load(f).items()}
+
+    async def search(self, query: str, max_results: int) -> list:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        key = normalize_query(query)
+        if key in self.fixtures:
+            return self.fixtures[key][:max_results]
+        slug = key.replace(" ", "-") or "empty"
+        return [
+            {"title": f"Result {i + 1} for {query}", "body": f"Snippet {i + 1} about {query}.",
+             "href": f"https://example.com/{slug}/{i + 1}"}
+            for i in range(max_results)
+        ]
+
+
+class SearchCache:
+    """TTL + LRU cache of search results keyed on (normalized query, max_results)"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (stored_at, results)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, results: list) -> None:
+        self._entries[key] = (time.monotonic(), results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class SearchTimeout(Exception):
+    """A backend search took longer than the service's per-query timeout"""
+
+
+class SearchService:
+    """
+    Cached search in front of a backend.
+
+    Identical queries already in flight share one backend call, so the model
+    issuing the same search twice in a step only hits the backend once.
+    Backend calls from every run go through one semaphore (`max_concurrency`
+    outstanding searches). Callers stop waiting after `timeout` seconds, but
+    the slot stays taken until the backend call itself finishes.
+    """
+
+    def __init__(self, backend: SearchBackend, cache: SearchCache = None, max_concurrency: int = 4, timeout: float = 10.0):
+        self.backend = backend
+        self.cache = cache or SearchCache()
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._in_flight = {}
+        self._limit = None
+        self._limit_loop = None
+        self.active = 0
+        self.peak_active = 0
+        self.timeouts = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # A semaphore belongs to one event loop; the CLI starts a new loop per query
+        loop = asyncio.get_running_loop()
+        if self._limit_loop is not loop:
+            self._limit, self._limit_loop = asyncio.Semaphore(self.max_concurrency), loop
+        return self._limit
+
+    def _finished(self, task: asyncio.Future, semaphore: asyncio.Semaphore) -> None:
+        self.active -= 1
+        semaphore.release()
+        if not task.cancelled():
+            task.exception()  # retrieved here in case the caller already gave up on it
+
+    async def _backend_search(self, query: str, max_results: int) -> list:
+        stats = run_search_stats.get()
+        semaphore = self._semaphore()
+        await semaphore.acquire()
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        start = time.perf_counter()
+        # The slot is released when the backend call really ends, not when we stop waiting:
+        # a timed-out DDGS search keeps its worker thread and pooled client until it returns
+        task = asyncio.ensure_future(self.backend.search(query, max_results))
+        task.add_done_callback(lambda done: self._finished(done, semaphore))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            if stats is not None:
+                stats["timeouts"] += 1
+            raise SearchTimeout(f"search for {query!r} timed out after {self.timeout:g}s") from None
+        finally:
+            if stats is not None:
+                stats["searches"] += 1
+                stats["search_seconds"] += time.perf_counter() - start
+
+    async def search(self, query: str, max_results: int = 5) -> list:
+        """Results for one query; raises SearchTimeout if the backend is too slow"""
+        key = (normalize_query(query), max_results)
+        results = self.cache.get(key)
+        if results is not None:
+            return results
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._backend_search(query, max_results))
+            self._in_flight[key] = task
+            try:
+                results = await asyncio.shield(task)
+            finally:
+                self._in_flight.pop(key, None)
+            self.cache.put(key, results)
+            return results
+        return await asyncio.shield(task)
+
+    async def search_many(self, queries: list, max_results: int = 5) -> dict:
+        """
+        Run independent queries concurrently.
+
+        Returns {query: results}, with None for queries that timed out, so one
+        slow search doesn't hold back the others.
+        """
+        async def one(query):
+            try:
+                return await self.search(query, max_results)
+            except SearchTimeout:
+                return None
+
+        queries = list(dict.fromkeys(queries))
+        return dict(zip(queries, await asyncio.gather(*(one(query) for query in queries))))
+
+
+def create_search_service(spec: str = "ddgs", max_concurrency: int = 4, timeout: float = 10.0) -> SearchService:
+    """
+    Build a search service from a backend spec.
+
+    - "ddgs" (default): DuckDuckGo with a pooled client
+    - "fixture" or "fixture:path/to/results.json": local stand-in
+    """
+    if spec == "ddgs":
+        # One pooled client per permitted search, so the semaphore is the only queue
+        return SearchService(DDGSBackend(pool_size=max_concurrency), max_concurrency=max_concurrency, timeout=timeout)
+    if spec == "fixture" or spec.startswith("fixture:"):
+        return SearchService(FixtureBackend(spec[len("fixture:"):] or None), max_concurrency=max_concurrency, timeout=timeout)
+    raise ValueError(f"Unknown search backend: {spec!r}")
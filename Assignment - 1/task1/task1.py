@@ -1,44 +1,161 @@
-
-import logfire
-from pydantic import BaseModel, Field
-from pydantic_ai import Agent, RunContext
-from ddgs import DDGS
+from __future__ import annotations
+from typing import TYPE_CHECKING
+from search import create_search_service, format_results, run_search_stats, SearchTimeout
+from pages import create_page_service, format_passages
+from response_cache import ResponseCache
+import argparse
+import asyncio
 import os
+import sys
+import time
+from pathlib import Path
 import dotenv
 dotenv.load_dotenv()
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))  # shared telemetry.py
+from telemetry import ensure_telemetry
+
+if TYPE_CHECKING:
+    # Imported by get_research_agent(): pydantic-ai takes about a second to import
+    from pydantic_ai import Agent, RunContext
+    from research_output import ResearchOutput
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-logfire.configure()
-logfire.instrument_pydantic_ai()
-
-class ResearchOutput(BaseModel):
-    summary: str = Field(description="A concise summary of the research findings")
-    key_facts: list[str] = Field(description="A list of 3-5 key facts extracted from the research")
-    sources: list[str] = Field(description="List of source URLs or references used")
-
-research_agent = Agent(
-    'google-gla:gemini-2.5-flash',
-    output_type=ResearchOutput,
-    instructions=(
-        "You are a research agent specialized in gathering and summarizing information. "
-        "Use the web_search tool to fetch relevant data from the internet. "
-        "Always cite sources and structure your output according to the schema."
-    ),
+# Cached, pooled search backend (SEARCH_BACKEND=fixture for an offline stand-in), shared by
+# every run: at most SEARCH_CONCURRENCY searches outstanding, each given SEARCH_TIMEOUT seconds
+search_service = create_search_service(
+    os.getenv("SEARCH_BACKEND", "ddgs"),
+    max_concurrency=int(os.getenv("SEARCH_CONCURRENCY", 4)),
+    timeout=float(os.getenv("SEARCH_TIMEOUT", 10)),
+)
+
+# Fetches the result pages and adds their most relevant passages to the search tools' output.
+# PAGE_FETCHER=off returns snippets only (the default with the fixture search backend)
+page_service = create_page_service(
+    os.getenv("PAGE_FETCHER", "off" if os.getenv("SEARCH_BACKEND", "ddgs").startswith("fixture") else "http"),
+    cache_path=os.getenv("PAGE_CACHE_PATH", "page_cache.db"),
+    max_concurrency=int(os.getenv("PAGE_FETCH_CONCURRENCY", 8)),
+    timeout=float(os.getenv("PAGE_FETCH_TIMEOUT", 8)),
 )
+PAGE_PASSAGES = int(os.getenv("PAGE_PASSAGES", 6))
+
+# Persistent response cache, opened on first use so --no-cache never touches the file
+_response_cache = None
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache(
+            os.getenv("RESPONSE_CACHE_PATH", "research_cache.db"),
+            ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", 86400)),
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000)),
+        )
+    return _response_cache
+
+async def with_passages(query: str, results: list) -> str:
+    """Search results followed by the top passages from their pages"""
+    text = format_results(results)
+    if page_service is None or not PAGE_PASSAGES:
+        return text
+    passages = await page_service.passages(query, results, top_k=PAGE_PASSAGES)
+    return text + "\n" + format_passages(passages) if passages else text
+
+async def web_search(ctx: RunContext, query: str) -> str:
+    """Perform a web search for the given query and return the top results and the most relevant passages from their pages."""
+    # Async so several searches requested in one model step run concurrently
+    try:
+        results = await search_service.search(query, max_results=5)
+    except SearchTimeout:
+        # Let the run carry on with whatever the other searches found
+        return f"Search for '{query}' timed out; no results."
+    return await with_passages(query, results)
 
-@research_agent.tool
-def web_search(ctx: RunContext, query: str) -> str:
-    """Perform a web search for the given query and return a string with the top results."""
-    with DDGS() as ddgs:
-        results = ddgs.text(query, max_results=5) 
-        formatted_results = []
-        for r in results:
-            formatted_results.append(f"Title: {r['title']}\nSnippet: {r['body']}\nURL: {r['href']}\n")
-    return "\n".join(formatted_results)
+async def web_search_many(ctx: RunContext, queries: list[str]) -> str:
+    """Search several independent queries at once and return the top results and passages for each."""
+    results = await search_service.search_many(queries, max_results=5)
+
+    async def section(query, found):
+        return f"## {query}\n" + (await with_passages(query, found) if found is not None else "Timed out; no results.\n")
+
+    return "\n".join(await asyncio.gather(*(section(query, found) for query, found in results.items())))
+
+# Built on first use, so cache hits and --help never load the Gemini provider;
+# Logfire + agent instrumentation (TELEMETRY=off, TELEMETRY_SAMPLE_RATE=0.1, ...) is configured with it
+_research_agent = None
+
+def get_research_agent() -> Agent:
+    # The tools' RunContext annotations are resolved against this module's globals
+    global _research_agent, RunContext
+    if _research_agent is None:
+        ensure_telemetry()
+        from pydantic_ai import Agent, RunContext
+        from research_output import ResearchOutput
+        _research_agent = Agent(
+            'google-gla:gemini-2.5-flash',
+            output_type=ResearchOutput,
+            tools=[web_search, web_search_many],
+            instructions=(
+                "You are a research agent specialized in gathering and summarizing information. "
+                "Use the web_search tool to fetch relevant data from the internet. "
+                "When you need several searches, request them together with web_search_many. "
+                "Always cite sources and structure your output according to the schema."
+            ),
+        )
+    return _research_agent
+
+def __getattr__(name):
+    # `from task1 import research_agent` still works, building the agent on first access
+    if name == "research_agent":
+        return get_research_agent()
+    if name == "ResearchOutput":
+        from research_output import ResearchOutput
+        return ResearchOutput
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+async def run_research(query: str, use_cache: bool = True, stats: dict = None) -> ResearchOutput:
+    """
+    Run research_agent, answering repeated (normalized) queries from the response cache.
+
+    If `stats` is given it is filled with the run's wall time, search count,
+    timeouts and summed search time; wall time well under the summed search
+    time means the searches overlapped.
+    """
+    start = time.perf_counter()
+    stats = {} if stats is None else stats
+    stats.update(searches=0, timeouts=0, search_seconds=0.0, wall_seconds=0.0)
+    ensure_telemetry()
+    import logfire
+    cache = get_response_cache() if use_cache else None
+    if cache is not None:
+        # SQLite; keep it off the event loop like the page cache
+        cached = await asyncio.to_thread(cache.get, query)
+        if cached is not None:
+            logfire.info("research cache hit", query=query, hit_rate=cache.hit_rate,
+                         latency_ms=round((time.perf_counter() - start) * 1000, 2))
+            from research_output import ResearchOutput
+            return ResearchOutput.model_validate(cached)
+    token = run_search_stats.set(stats)
+    try:
+        result = await get_research_agent().run(query)
+    finally:
+        run_search_stats.reset(token)
+        stats["wall_seconds"] = time.perf_counter() - start
+    logfire.info("research run", query=query, searches=stats["searches"], timeouts=stats["timeouts"],
+                 wall_ms=round(stats["wall_seconds"] * 1000, 1), search_ms=round(stats["search_seconds"] * 1000, 1))
+    if cache is not None:
+        # An answer built on timed-out searches is partial; don't serve it to repeats for the whole TTL
+        if not stats["timeouts"]:
+            await asyncio.to_thread(cache.put, query, result.output.model_dump())
+        logfire.info("research cache miss", query=query, hit_rate=cache.hit_rate, cached=not stats["timeouts"],
+                     latency_ms=round((time.perf_counter() - start) * 1000, 2))
+    return result.output
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interactive research agent")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the persistent response cache")
+    args = parser.parse_args()
+
     print("Research Agent (type 'exit' to quit)")
     while True:
         query = input("Enter your research query: ")
@@ -46,6 +163,8 @@ if __name__ == "__main__":
             print("Exiting.")
             break
         print(f"Running research agent for query: {query}")
-        result = research_agent.run_sync(query)
+        output = asyncio.run(run_research(query, use_cache=not args.no_cache))
         print("Research Output:")
-        print(result.output)
\ No newline at end of file
+        print(output)
+    if not args.no_cache:
+        print(f"Response cache: {get_response_cache().stats()}")
\ No newline at end of file
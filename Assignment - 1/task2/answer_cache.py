@@ -0,0 +1,123 @@
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+# Tools that change the cart; a turn that called any of them is never cached
+MUTATING_TOOLS = {"manage_cart", "manage_cart_bulk"}
+
+# Words that refer back to earlier turns ("how much is it?"), so the answer depends on history
+CONTEXT_WORDS = frozenset("it its this that these those them they one ones same again also too else more".split())
+
+# Running totals for /metrics
+answer_cache_stats = {"hits": 0, "misses": 0, "stores": 0, "skipped": 0, "evictions": 0}
+
+
+def normalize_message(message: str) -> str:
+    """Case-fold, drop punctuation and collapse whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", message.casefold()).split())
+
+
+def is_cacheable_message(normalized: str) -> bool:
+    """Self-contained questions only - nothing that points back at earlier turns"""
+    words = normalized.split()
+    return bool(words) and not CONTEXT_WORDS.intersection(words)
+
+
+def history_fingerprint(history: list) -> str:
+    """Digest of the conversation so far (part kinds, tool names and contents, no timestamps)"""
+    # Message classes are imported on use: loading pydantic-ai is most of the app's startup time
+    from pydantic_ai.messages import ToolCallPart
+    digest = hashlib.blake2b(digest_size=16)
+    for message in history:
+        for part in message.parts:
+            content = part.args_as_json_str() if isinstance(part, ToolCallPart) else getattr(part, "content", "")
+            digest.update(f"{part.part_kind}\x1f{getattr(part, 'tool_name', '')}\x1f{content}\x1e".encode())
+    return digest.hexdigest()
+
+
+def is_self_contained(new_messages: list) -> bool:
+    """
+    True if the run only added this turn's own prompt, text and tool round trips.
+
+    Anything else (e.g. a summary of earlier turns inserted by history
+    compaction) carries history into the reply, so the turn isn't stored.
+    """
+    from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, ToolCallPart, ToolReturnPart, UserPromptPart
+    allowed = (UserPromptPart, TextPart, ToolCallPart, ToolReturnPart)
+    return all(
+        isinstance(message, (ModelRequest, ModelResponse)) and all(isinstance(part, allowed) for part in message.parts)
+        for message in new_messages
+    )
+
+
+def is_informational(new_messages: list) -> bool:
+    """True if the run made no cart-changing tool calls"""
+    from pydantic_ai.messages import ModelResponse, ToolCallPart
+    return not any(
+        isinstance(part, ToolCallPart) and part.tool_name in MUTATING_TOOLS
+        for message in new_messages if isinstance(message, ModelResponse)
+        for part in message.parts
+    )
+
+
+class AnswerCache:
+    """
+    LRU cache of agent replies to informational questions.
+
+    Keyed on (normalized message, catalog version, cart fingerprint, history
+    fingerprint): the same question about the same catalog and cart, asked at
+    the same point of the same conversation, gets the same answer. Replies
+    that lean on earlier turns ("what is my name?") are therefore never served
+    to another session with a different history.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def _key(self, message: str, catalog, cart, history: list):
+        normalized = normalize_message(message)
+        if not self.max_entries or not is_cacheable_message(normalized):
+            return None
+        return normalized, catalog.version, cart.fingerprint(), history_fingerprint(history)
+
+    def get(self, message: str, catalog, cart, history: list):
+        """Stored reply for the message, given the agent history before this turn"""
+        key = self._key(message, catalog, cart, history)
+        reply = self._entries.get(key) if key else None
+        if reply is None:
+            answer_cache_stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        answer_cache_stats["hits"] += 1
+        return reply
+
+    def put(self, message: str, catalog, cart, history: list, reply: str, new_messages: list) -> None:
+        """
+        Store the reply if the turn was informational and self-contained.
+
+        `cart` is the cart after the run, `history` the agent history before it.
+        """
+        key = self._key(message, catalog, cart, history)
+        if key is None or not is_informational(new_messages) or not is_self_contained(new_messages):
+            answer_cache_stats["skipped"] += 1
+            return
+        self._entries[key] = reply
+        self._entries.move_to_end(key)
+        answer_cache_stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            answer_cache_stats["evictions"] += 1
+
+    def hit_ratio(self) -> float:
+        lookups = answer_cache_stats["hits"] + answer_cache_stats["misses"]
+        return answer_cache_stats["hits"] / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def create_answer_cache() -> AnswerCache:
+    """ANSWER_CACHE_SIZE entries (default 4096); 0 disables the cache"""
+    return AnswerCache(int(os.getenv("ANSWER_CACHE_SIZE", 4096)))
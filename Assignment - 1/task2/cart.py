@@ -0,0 +1,120 @@
+def to_cents(price) -> int:
+    """Dollar float -> integer cents, so totals never drift"""
+    return round(price * 100)
+
+
+class CartLine:
+    """One product line in a cart"""
+
+    __slots__ = ('name', 'quantity', 'price_cents', 'emoji')
+
+    def __init__(self, name: str, quantity: int, price_cents: int, emoji: str):
+        self.name = name
+        self.quantity = quantity
+        self.price_cents = price_cents
+        self.emoji = emoji
+
+    @property
+    def price(self) -> float:
+        return self.price_cents / 100
+
+
+class Cart:
+    """
+    Shopping cart with O(1) totals.
+
+    Lines are __slots__ objects keyed by product name, prices are integer
+    cents, and the subtotal and item count are kept up to date on every change
+    instead of being re-summed for each render.
+    """
+
+    __slots__ = ('_lines', 'subtotal_cents', 'item_count')
+
+    def __init__(self):
+        self._lines = {}
+        self.subtotal_cents = 0
+        self.item_count = 0
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __bool__(self):
+        return bool(self._lines)
+
+    def __contains__(self, name):
+        return name in self._lines
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def get(self, name: str):
+        return self._lines.get(name)
+
+    @property
+    def total(self) -> float:
+        return self.subtotal_cents / 100
+
+    def set_quantity(self, name: str, quantity: int, price: float = 0, emoji: str = '📦'):
+        """Set a line's quantity (0 removes it), keeping the running totals in step"""
+        line = self._lines.get(name)
+        if line is None:
+            if quantity <= 0:
+                return
+            line = self._lines[name] = CartLine(name, 0, to_cents(price), emoji)
+        delta = max(quantity, 0) - line.quantity
+        self.item_count += delta
+        self.subtotal_cents += delta * line.price_cents
+        if quantity <= 0:
+            del self._lines[name]
+        else:
+            line.quantity = quantity
+
+    def apply(self, cart_action: dict, changes: dict = None):
+        """Apply a manage_cart style action (add/remove/update).
+
+        `changes` maps each touched product to whether it was in the cart before,
+        which is what the incremental renderers need.
+        """
+        action = cart_action.get('action')
+        product_name = cart_action.get('product')
+        quantity = cart_action.get('quantity', 1)
+        price = cart_action.get('price', 0)
+        emoji = cart_action.get('emoji', '📦')
+
+        if changes is not None:
+            changes.setdefault(product_name, product_name in self._lines)
+
+        if action == 'add':
+            line = self._lines.get(product_name)
+            self.set_quantity(product_name, (line.quantity if line else 0) + quantity, price, emoji)
+        elif action == 'remove':
+            self.set_quantity(product_name, 0)
+        elif action == 'update':
+            self.set_quantity(product_name, quantity, price, emoji)
+
+    def line_summary(self, name: str) -> str:
+        """Compact tool result for the model: where the product stands in the cart now"""
+        line = self._lines.get(name)
+        if line is None:
+            return f"OK: {name} is not in the cart."
+        return f"OK: {name} quantity is now {line.quantity} (${line.price:.2f} each)."
+
+    def fingerprint(self) -> int:
+        """Hash of the cart contents (in-process only), for caching answers that depend on them"""
+        return hash(tuple((line.name, line.quantity, line.price_cents) for line in self._lines.values()))
+
+    def to_state(self) -> list:
+        """Compact JSON-friendly form: [[name, quantity, price_cents, emoji], ...]"""
+        return [[line.name, line.quantity, line.price_cents, line.emoji] for line in self._lines.values()]
+
+    @classmethod
+    def from_state(cls, state) -> 'Cart':
+        """Inverse of to_state; also accepts the old {name: {quantity, price, emoji}} dicts"""
+        cart = cls()
+        if isinstance(state, dict):
+            state = [[name, item['quantity'], to_cents(item['price']), item['emoji']] for name, item in state.items()]
+        for name, quantity, price_cents, emoji in state:
+            cart._lines[name] = CartLine(name, quantity, price_cents, emoji)
+            cart.item_count += quantity
+            cart.subtotal_cents += quantity * price_cents
+        return cart
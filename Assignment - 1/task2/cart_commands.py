@@ -0,0 +1,112 @@
+import re
+from task2 import catalog
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+MAX_QUANTITY = 999
+
+_QTY = r"(\d+|" + "|".join(NUMBER_WORDS) + r")"
+_CART = r"(?:\s+(?:to|in|into|from)\s+(?:my\s+|the\s+)?cart)?"
+
+ADD_PATTERN = re.compile(r"^(?:please\s+)?(?:add|put)\s+(?:" + _QTY + r"\s+)?(?:x\s+)?(.+?)" + _CART + r"$")
+REMOVE_PATTERN = re.compile(r"^(?:please\s+)?(?:remove|delete|drop)\s+(?:all\s+)?(?:the\s+|my\s+)?(.+?)" + _CART + r"$")
+UPDATE_PATTERN = re.compile(
+    r"^(?:please\s+)?(?:update|set|change)\s+(?:the\s+)?(?:quantity\s+of\s+)?(?:my\s+)?(.+?)"
+    r"(?:\s+quantity)?" + _CART + r"\s+to\s+(\d+)$"
+)
+
+# Hit/miss counters - hits never reach the model
+fast_path_stats = {"hits": 0, "misses": 0}
+
+
+def _parse_quantity(token):
+    if token is None:
+        return 1
+    if token.isdigit():
+        return int(token)
+    return NUMBER_WORDS[token]
+
+
+def _cart_action(action: str, product: dict, quantity: int) -> dict:
+    """Build a cart action in the same shape manage_cart returns"""
+    return {
+        "action": action,
+        "product": product["name"],
+        "quantity": quantity,
+        "price": product["price"],
+        "emoji": product["emoji"],
+        "custom": False,
+    }
+
+
+def parse_cart_command(message: str):
+    """
+    Recognise unambiguous add/remove/update commands for catalog products.
+
+    Returns a cart action dict (same shape as manage_cart's result) or None when
+    the message should go to the agent instead.
+    """
+    text = " ".join(message.lower().strip().rstrip(".!").split())
+
+    match = ADD_PATTERN.match(text)
+    if match:
+        product = catalog.match(match.group(2))
+        quantity = _parse_quantity(match.group(1))
+        if product and 0 < quantity <= MAX_QUANTITY:
+            return _cart_action("add", product, quantity)
+        return None
+
+    match = REMOVE_PATTERN.match(text)
+    if match:
+        product = catalog.match(match.group(1))
+        if product:
+            return _cart_action("remove", product, 0)
+        return None
+
+    match = UPDATE_PATTERN.match(text)
+    if match:
+        product = catalog.match(match.group(1))
+        quantity = int(match.group(2))
+        if product and quantity <= MAX_QUANTITY:
+            return _cart_action("update", product, quantity)
+        return None
+
+    return None
+
+
+def describe_cart_action(cart_action: dict, in_cart: bool = True) -> str:
+    """Friendly confirmation text for a fast-path cart action (`in_cart`: was the product in the cart before)"""
+    name = cart_action["product"]
+    emoji = cart_action["emoji"]
+    quantity = cart_action["quantity"]
+    if cart_action["action"] == "add":
+        return f"Added {quantity} × {name} {emoji} to your cart."
+    if cart_action["action"] == "remove" or quantity == 0:
+        if not in_cart:
+            return f"{name} {emoji} isn't in your cart."
+        return f"Removed {name} {emoji} from your cart."
+    return f"Updated {name} {emoji} to a quantity of {quantity}."
+
+
+def try_fast_path(message: str):
+    """Parse a message and record a fast-path hit or miss"""
+    import logfire
+    cart_action = parse_cart_command(message)
+    if cart_action:
+        fast_path_stats["hits"] += 1
+    else:
+        fast_path_stats["misses"] += 1
+    logfire.info('Cart fast path', hit=cart_action is not None, **fast_path_stats)
+    return cart_action
+
+
+def fast_path_messages(user_input: str, reply: str) -> list:
+    """Synthetic agent history for a fast-path turn so the model keeps the context"""
+    from pydantic_ai.messages import ModelRequest, ModelResponse, UserPromptPart, TextPart
+    return [
+        ModelRequest(parts=[UserPromptPart(content=user_input)]),
+        ModelResponse(parts=[TextPart(content=reply)]),
+    ]
@@ -0,0 +1,123 @@
+import csv
+import hashlib
+import json
+import os
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from functools import cached_property
+from pathlib import Path
+
+DEFAULT_CATALOG_PATH = Path(__file__).with_name("products.json")
+
+
+def _fold(name: str) -> str:
+    return " ".join(name.casefold().split())
+
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Catalog:
+    """
+    Product catalog with precomputed lookup indexes.
+
+    - exact lookups go through a case-folded name -> product dict
+    - prefix lookups bisect a sorted list of folded names
+    - fuzzy lookups (misspellings) narrow candidates with a trigram index
+      before scoring them with difflib, so they stay fast at 100k+ SKUs
+    """
+
+    # Upper bound on trigram postings scanned per fuzzy lookup
+    FUZZY_SCAN_LIMIT = 20_000
+
+    def __init__(self, products: list):
+        self.products = products
+        self.names = [p["name"] for p in products]
+        self._by_name = {_fold(p["name"]): p for p in products}
+        self._sorted_names = sorted(self._by_name)
+        self._trigram_index = defaultdict(list)
+        for folded in self._sorted_names:
+            for gram in _trigrams(folded):
+                self._trigram_index[gram].append(folded)
+
+    def __len__(self):
+        return len(self.products)
+
+    @cached_property
+    def version(self) -> str:
+        """Content hash of the products, so caches keyed on it go stale when the catalog changes"""
+        return hashlib.sha1(json.dumps(self.products, sort_keys=True).encode()).hexdigest()[:16]
+
+    def __iter__(self):
+        return iter(self.products)
+
+    def get(self, name: str):
+        """Exact, case-insensitive lookup"""
+        return self._by_name.get(_fold(name))
+
+    def match(self, name: str):
+        """Exact lookup that also accepts simple plurals ("toothbrushes")"""
+        folded = _fold(name)
+        for candidate in (folded, folded[:-1] if folded.endswith("s") else None, folded[:-2] if folded.endswith("es") else None):
+            if candidate and candidate in self._by_name:
+                return self._by_name[candidate]
+        return None
+
+    def prefix(self, prefix: str, limit: int = 10) -> list:
+        """Products whose name starts with `prefix`, alphabetically"""
+        folded = _fold(prefix)
+        results = []
+        i = bisect_left(self._sorted_names, folded)
+        while i < len(self._sorted_names) and len(results) < limit and self._sorted_names[i].startswith(folded):
+            results.append(self._by_name[self._sorted_names[i]])
+            i += 1
+        return results
+
+    def fuzzy(self, name: str, limit: int = 5, cutoff: float = 0.6) -> list:
+        """Closest products to a possibly misspelled name, best first"""
+        folded = _fold(name)
+        # Rarest trigrams first; stop once enough candidates are collected so
+        # very common grams (" sa", "ing") don't turn this into a full scan
+        postings = sorted((self._trigram_index.get(gram, ()) for gram in _trigrams(folded)), key=len)
+        counts = Counter()
+        scanned = 0
+        for i, posting in enumerate(postings):
+            if i >= 3 and scanned + len(posting) > self.FUZZY_SCAN_LIMIT:
+                break
+            counts.update(posting)
+            scanned += len(posting)
+        scored = []
+        for candidate, _ in counts.most_common(50):
+            score = SequenceMatcher(None, folded, candidate).ratio()
+            if score >= cutoff:
+                scored.append((score, candidate))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [self._by_name[candidate] for _, candidate in scored[:limit]]
+
+    def suggest(self, name: str, limit: int = 5) -> list:
+        """Prefix matches first, then fuzzy matches - for "did you mean" messages"""
+        results = self.prefix(name, limit)
+        for product in self.fuzzy(name, limit):
+            if len(results) >= limit:
+                break
+            if product not in results:
+                results.append(product)
+        return results
+
+
+def load_catalog(path=None) -> Catalog:
+    """Load a catalog from a JSON list or a CSV file with name,price,emoji columns"""
+    path = Path(path or os.getenv("CATALOG_PATH") or DEFAULT_CATALOG_PATH)
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            products = [
+                {"name": row["name"], "price": float(row["price"]), "emoji": row.get("emoji") or "📦"}
+                for row in csv.DictReader(f)
+            ]
+    else:
+        with open(path, encoding="utf-8") as f:
+            products = json.load(f)
+    return Catalog(products)
@@ -1,51 +1,119 @@
 from fasthtml.common import *
 import asyncio
-from task2 import run_agent_with_logging
-import json
+import hashlib
+import mimetypes
+import os
+import time
+import uuid
+from task2 import run_agent_with_logging, stream_agent_with_logging, CartDeps, catalog
+from telemetry import ensure_telemetry
+from cart_commands import try_fast_path, describe_cart_action, fast_path_messages
+from session_store import create_session_store, new_session
+from session_locks import SessionLocks, SharedSessionLocks, lock_stats
+from cart_commands import fast_path_stats
+from answer_cache import create_answer_cache, answer_cache_stats
+from timing import phase, register_stats, render_metrics, TimingMiddleware
+from starlette.middleware import Middleware
 from starlette.requests import Request
+from starlette.responses import Response, HTMLResponse
+from pathlib import Path
+
+# Stream bot responses over SSE (set SHOP_STREAMING=0 to wait for the full response)
+STREAMING = os.getenv("SHOP_STREAMING", "1") != "0"
+# Seconds a streamed turn waits for its /stream request before the next send drops it
+PENDING_TURN_TTL = float(os.getenv("PENDING_TURN_TTL", 60))
+
+async def flush_sessions():
+    """Shutdown hook: let in-flight requests save their sessions, then close the store"""
+    drained = await session_locks.drain(float(os.getenv("SHUTDOWN_TIMEOUT", 10)))
+    ensure_telemetry()
+    import logfire
+    logfire.info('Session store closed', drained=drained, in_flight=len(session_locks))
+    sessions.close()
+
+def first_request_setup():
+    """Work deferred out of import time, so workers start without loading logfire or pydantic-ai"""
+    ensure_telemetry()
+    # history imports pydantic-ai; its token stats join /metrics from the first request
+    from history import history_stats
+    register_stats("history", history_stats)
 
 app, rt = fast_app(
+    on_shutdown=[flush_sessions],
+    # Per-request timing and Server-Timing headers (see /metrics); telemetry is
+    # configured on the first request rather than at import
+    middleware=[Middleware(TimingMiddleware, setup=first_request_setup)],
     hdrs=(
         Script(src="https://unpkg.com/htmx.org@1.9.10"),
-    )
+        Script(src="https://unpkg.com/htmx.org@1.9.10/dist/ext/sse.js"),
+    ),
+    # Static assets are served by /static/{fname} below with long-lived cache headers
+    static_path=None
 )
 
-# Session storage - per user session
-sessions = {}
+def load_static_assets(directory: Path):
+    """Read CSS/JS once at startup: filename -> (body, media type, etag)"""
+    assets = {}
+    for path in directory.iterdir():
+        body = path.read_bytes()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        assets[path.name] = (body, mimetypes.guess_type(path.name)[0] or "application/octet-stream", etag)
+    return assets
+
+STATIC_ASSETS = load_static_assets(Path(__file__).with_name("static"))
+
+def static_url(fname: str):
+    """Versioned URL for a static asset, so it can be cached forever"""
+    etag = STATIC_ASSETS[fname][2]
+    return f"/static/{fname}?v={etag[1:-1]}"
+
+# Session storage - per user session, loaded lazily per request
+# (SESSION_STORE=sqlite:sessions.db shares sessions across worker processes)
+sessions = create_session_store(os.getenv("SESSION_STORE", "memory"))
+# Serializes requests within a session; sessions are loaded and saved while holding it
+# (SESSION_LOCK_FILE=sessions.lock extends this across worker processes, see server.py)
+session_locks = SharedSessionLocks(os.environ["SESSION_LOCK_FILE"]) if os.getenv("SESSION_LOCK_FILE") else SessionLocks()
+
+register_stats("fast_path", fast_path_stats)
+register_stats("session_lock", lock_stats)
+register_stats("answer_cache", answer_cache_stats)
+
+# Replies to informational questions, shared by all sessions (ANSWER_CACHE_SIZE=0 disables)
+answer_cache = create_answer_cache()
 
 def get_session_id(request: Request):
     """Get or create session ID from cookie"""
     session_id = request.cookies.get('session_id')
     if not session_id:
-        import uuid
         session_id = str(uuid.uuid4())
     return session_id
 
-def get_session_data(session_id: str):
+async def get_session_data(session_id: str):
     """Get session data, create if doesn't exist"""
-    if session_id not in sessions:
-        sessions[session_id] = {
-            'messages': [],
-            'agent_message_history': [],
-            'cart': {}
-        }
-    return sessions[session_id]
+    with phase('session_load'):
+        # Store calls can block on SQLite, so keep them off the event loop
+        session_data = await asyncio.to_thread(sessions.load, session_id)
+    if session_data is None:
+        session_data = new_session()
+    return session_data
 
-# Available products
-products = [
-    {"name": "Salt", "price": 2.50, "emoji": "🧂"},
-    {"name": "Pepper", "price": 3.00, "emoji": "🌶️"},
-    {"name": "Toothpaste", "price": 4.99, "emoji": "🦷"},
-    {"name": "Toothbrush", "price": 3.50, "emoji": "🪥"},
-    {"name": "Detergent", "price": 8.99, "emoji": "🧴"},
-    {"name": "Soap", "price": 2.99, "emoji": "🧼"},
-    {"name": "Shampoo", "price": 6.99, "emoji": "🧴"},
-    {"name": "Paper Towels", "price": 5.49, "emoji": "🧻"},
-]
+async def save_session_data(session_id: str, session_data: dict):
+    """Write session data back to the store after a request changed it"""
+    with phase('session_save'):
+        await asyncio.to_thread(sessions.save, session_id, session_data)
+
+def render(components):
+    """Render a handler's components to HTML here, so rendering is timed as its own phase"""
+    with phase('render'):
+        return HTMLResponse(to_xml(tuple(components)))
 
 # Product card no longer needed - products shown in sidebar
 
-def CartItem(name, price, emoji, quantity):
+def cart_item_id(name):
+    """Stable DOM id for a cart line (names may contain spaces or punctuation)"""
+    return "cart-item-" + hashlib.sha1(name.encode()).hexdigest()[:12]
+
+def CartItem(name, price, emoji, quantity, **kwargs):
     """Create a cart item card with quantity controls"""
     return Div(
         Div(
@@ -60,20 +128,22 @@ def CartItem(name, price, emoji, quantity):
         Div(
             Button("-", 
                 hx_post=f"/cart/decrease/{name}",
-                hx_target="#cart-items",
-                hx_swap="innerHTML",
+                hx_target="closest .cart-item",
+                hx_swap="outerHTML",
                 cls="qty-button"
             ),
             Span(str(quantity), cls="qty-value"),
             Button("+",
                 hx_post=f"/cart/increase/{name}",
-                hx_target="#cart-items",
-                hx_swap="innerHTML",
+                hx_target="closest .cart-item",
+                hx_swap="outerHTML",
                 cls="qty-button"
             ),
             cls="cart-item-controls"
         ),
-        cls="cart-item"
+        id=cart_item_id(name),
+        cls="cart-item",
+        **kwargs
     )
 
 def ChatMessage(text, is_user=False):
@@ -92,698 +162,43 @@ def ChatMessage(text, is_user=False):
         style="animation: fadeIn 0.3s;"
     )
 
-@rt("/")
-def get(request: Request):
-    """Main chat page"""
-    session_id = get_session_id(request)
-    # Initialize session data
-    get_session_data(session_id)
-    
-    response = Html(
+def LoadOlderMessages(cursor):
+    """Sentinel above the oldest rendered message; swaps itself for the previous page when scrolled into view"""
+    return Div(
+        "Loading earlier messages...",
+        cls="load-more",
+        hx_get=f"/messages?before={cursor}",
+        hx_trigger="intersect once",
+        hx_swap="outerHTML"
+    )
+
+def StreamingChatMessage(turn_id):
+    """Bot message that fills itself from the /stream SSE endpoint"""
+    return Div(
+        Div("AI", cls="avatar bot"),
+        Div(
+            Div(cls="message-text", sse_swap="chunk", hx_swap="beforeend"),
+            Div(style="display: none;", sse_swap="cart", hx_swap="none"),
+            cls="message-content"
+        ),
+        cls="message-wrapper bot",
+        style="animation: fadeIn 0.3s;",
+        hx_ext="sse",
+        sse_connect=f"/stream/{turn_id}",
+        sse_close="done"
+    )
+
+def page_shell():
+    """Static page shell - identical for every session, so it is rendered once"""
+    return Html(
         Head(
             Title("Shopping Assistant"),
             Meta(name="viewport", content="width=device-width, initial-scale=1.0"),
             Link(rel="stylesheet", href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap"),
-            Style("""
-                * {
-                    margin: 0;
-                    padding: 0;
-                    box-sizing: border-box;
-                }
-                
-                body {
-                    font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
-                    background: #0f1419;
-                    height: 100vh;
-                    display: flex;
-                    color: #e7eaed;
-                    overflow: hidden;
-                }
-                
-                .main-wrapper {
-                    display: flex;
-                    width: 100%;
-                    height: 100vh;
-                }
-                
-                .main-content {
-                    flex: 1;
-                    display: flex;
-                    flex-direction: column;
-                    max-width: 1200px;
-                    margin: 0 auto;
-                    width: 100%;
-                }
-                
-                .chat-header {
-                    padding: 20px 32px;
-                    border-bottom: 1px solid #2f3336;
-                    background: linear-gradient(180deg, #171717 0%, #1a1a1a 100%);
-                    display: flex;
-                    align-items: center;
-                    justify-content: space-between;
-                    box-shadow: 0 2px 8px rgba(0, 0, 0, 0.3);
-                }
-                
-                .header-left {
-                    display: flex;
-                    align-items: center;
-                    gap: 12px;
-                }
-                
-                .logo {
-                    width: 40px;
-                    height: 40px;
-                    background: linear-gradient(135deg, #10a37f 0%, #16c79a 100%);
-                    border-radius: 8px;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    font-size: 20px;
-                    font-weight: 700;
-                    color: white;
-                    position: relative;
-                    overflow: hidden;
-                }
-                
-                .logo::before {
-                    content: '';
-                    position: absolute;
-                    top: -50%;
-                    left: -50%;
-                    width: 200%;
-                    height: 200%;
-                    background: linear-gradient(
-                        45deg,
-                        transparent,
-                        rgba(255, 255, 255, 0.1),
-                        transparent
-                    );
-                    animation: shimmer 3s infinite;
-                }
-                
-                @keyframes shimmer {
-                    0% {
-                        transform: translateX(-100%) translateY(-100%) rotate(45deg);
-                    }
-                    100% {
-                        transform: translateX(100%) translateY(100%) rotate(45deg);
-                    }
-                }
-                
-                .header-info {
-                    display: flex;
-                    flex-direction: column;
-                }
-                
-                .chat-title {
-                    font-size: 16px;
-                    font-weight: 600;
-                    color: #e7eaed;
-                }
-                
-                .chat-subtitle {
-                    font-size: 12px;
-                    color: #8b98a5;
-                    margin-top: 2px;
-                }
-                
-                .header-badge {
-                    padding: 6px 12px;
-                    background: #2f3336;
-                    border-radius: 16px;
-                    font-size: 11px;
-                    color: #10a37f;
-                    font-weight: 600;
-                    text-transform: uppercase;
-                    letter-spacing: 0.5px;
-                }
-                
-                .chat-messages {
-                    flex: 1;
-                    overflow-y: auto;
-                    padding: 32px;
-                    display: flex;
-                    flex-direction: column;
-                    gap: 28px;
-                }
-                
-                .welcome-message {
-                    text-align: center;
-                    padding: 60px 20px;
-                    max-width: 600px;
-                    margin: 0 auto;
-                }
-                
-                .welcome-icon {
-                    font-size: 56px;
-                    margin-bottom: 24px;
-                    animation: float 3s ease-in-out infinite;
-                }
-                
-                @keyframes float {
-                    0%, 100% {
-                        transform: translateY(0);
-                    }
-                    50% {
-                        transform: translateY(-10px);
-                    }
-                }
-                
-                .welcome-title {
-                    font-size: 28px;
-                    font-weight: 700;
-                    color: #e7eaed;
-                    margin-bottom: 12px;
-                    background: linear-gradient(135deg, #10a37f 0%, #3b82f6 100%);
-                    -webkit-background-clip: text;
-                    -webkit-text-fill-color: transparent;
-                    background-clip: text;
-                }
-                
-                .welcome-text {
-                    font-size: 14px;
-                    color: #8b98a5;
-                    line-height: 1.6;
-                    margin-bottom: 24px;
-                }
-                
-                .quick-prompts {
-                    display: grid;
-                    grid-template-columns: repeat(2, 1fr);
-                    gap: 12px;
-                    margin-top: 24px;
-                }
-                
-                .prompt-card {
-                    padding: 16px;
-                    background: #2f3336;
-                    border-radius: 10px;
-                    text-align: left;
-                    cursor: pointer;
-                    transition: all 0.2s;
-                    border: 1px solid transparent;
-                }
-                
-                .prompt-card:hover {
-                    background: #3a3f44;
-                    border-color: #10a37f;
-                    transform: translateY(-2px);
-                    box-shadow: 0 4px 12px rgba(16, 163, 127, 0.2);
-                }
-                
-                .prompt-card:active {
-                    transform: translateY(0);
-                }
-                
-                .prompt-icon {
-                    font-size: 20px;
-                    margin-bottom: 8px;
-                }
-                
-                .prompt-text {
-                    font-size: 13px;
-                    color: #e7eaed;
-                    font-weight: 500;
-                }
-                
-                .message-wrapper {
-                    display: flex;
-                    gap: 16px;
-                    max-width: 100%;
-                }
-                
-                .message-wrapper.user {
-                    flex-direction: row-reverse;
-                    justify-content: flex-start;
-                }
-                
-                .message-wrapper.bot {
-                    justify-content: flex-start;
-                }
-                
-                .avatar {
-                    width: 36px;
-                    height: 36px;
-                    border-radius: 50%;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    flex-shrink: 0;
-                    font-size: 16px;
-                    font-weight: 600;
-                }
-                
-                .avatar.bot {
-                    background: linear-gradient(135deg, #10a37f 0%, #16c79a 100%);
-                    color: white;
-                }
-                
-                .avatar.user {
-                    background: linear-gradient(135deg, #3b82f6 0%, #6366f1 100%);
-                    color: white;
-                }
-                
-                .message-content {
-                    flex: 0 1 auto;
-                    min-width: 0;
-                    max-width: 75%;
-                }
-                
-                .message-text {
-                    padding: 16px 18px;
-                    border-radius: 14px;
-                    line-height: 1.6;
-                    font-size: 14px;
-                    word-wrap: break-word;
-                    display: inline-block;
-                    width: 100%;
-                }
-                
-                .message-wrapper.bot .message-text {
-                    background: #2f3336;
-                    color: #e7eaed;
-                    box-shadow: 0 2px 8px rgba(0, 0, 0, 0.2);
-                }
-                
-                .message-wrapper.user .message-text {
-                    background: linear-gradient(135deg, #3b82f6 0%, #6366f1 100%);
-                    color: white;
-                    box-shadow: 0 2px 12px rgba(59, 130, 246, 0.3);
-                }
-                
-                .typing-indicator {
-                    display: flex;
-                    gap: 16px;
-                    max-width: 100%;
-                    animation: fadeIn 0.3s;
-                }
-                
-                .typing-indicator .avatar {
-                    width: 36px;
-                    height: 36px;
-                    border-radius: 50%;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    flex-shrink: 0;
-                    font-size: 16px;
-                    font-weight: 600;
-                    background: linear-gradient(135deg, #10a37f 0%, #16c79a 100%);
-                    color: white;
-                }
-                
-                .typing-indicator .message-content {
-                    flex: 1;
-                    min-width: 0;
-                }
-                
-                .typing-indicator .message-text {
-                    padding: 16px 18px;
-                    border-radius: 14px;
-                    background: #2f3336;
-                    display: inline-flex;
-                    gap: 4px;
-                    align-items: center;
-                }
-                
-                .typing-dot {
-                    width: 8px;
-                    height: 8px;
-                    background: #8b98a5;
-                    border-radius: 50%;
-                    animation: typing 1.4s infinite ease-in-out;
-                }
-                
-                .typing-dot:nth-child(1) {
-                    animation-delay: 0s;
-                }
-                
-                .typing-dot:nth-child(2) {
-                    animation-delay: 0.2s;
-                }
-                
-                .typing-dot:nth-child(3) {
-                    animation-delay: 0.4s;
-                }
-                
-                @keyframes typing {
-                    0%, 60%, 100% {
-                        transform: translateY(0);
-                        opacity: 0.4;
-                    }
-                    30% {
-                        transform: translateY(-8px);
-                        opacity: 1;
-                    }
-                }
-                
-                .chat-input-container {
-                    padding: 24px 32px 32px;
-                    background: #171717;
-                    border-top: 1px solid #2f3336;
-                }
-                
-                .input-wrapper {
-                    max-width: 900px;
-                    margin: 0 auto;
-                    position: relative;
-                    display: flex;
-                    align-items: center;
-                    background: #2f3336;
-                    border-radius: 28px;
-                    padding: 6px 6px 6px 24px;
-                    transition: all 0.2s;
-                    box-shadow: 0 4px 12px rgba(0, 0, 0, 0.3);
-                }
-                
-                .input-wrapper:focus-within {
-                    background: #3a3f44;
-                    box-shadow: 0 0 0 2px #10a37f, 0 6px 16px rgba(0, 0, 0, 0.4);
-                }
-                
-                .input-wrapper.loading {
-                    opacity: 0.6;
-                    pointer-events: none;
-                }
-                
-                .chat-input {
-                    flex: 1;
-                    padding: 12px 0;
-                    background: transparent;
-                    border: none;
-                    outline: none;
-                    color: #e7eaed;
-                    font-size: 15px;
-                    font-family: inherit;
-                    resize: none;
-                    max-height: 200px;
-                }
-                
-                .chat-input::placeholder {
-                    color: #8b98a5;
-                }
-                
-                .chat-input:disabled {
-                    cursor: not-allowed;
-                }
-                
-                .send-button {
-                    width: 40px;
-                    height: 40px;
-                    background: linear-gradient(135deg, #10a37f 0%, #16c79a 100%);
-                    color: white;
-                    border: none;
-                    border-radius: 50%;
-                    cursor: pointer;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    transition: all 0.2s;
-                    flex-shrink: 0;
-                    font-size: 18px;
-                    font-weight: 700;
-                    box-shadow: 0 2px 8px rgba(16, 163, 127, 0.3);
-                }
-                
-                .send-button:hover:not(:disabled) {
-                    background: linear-gradient(135deg, #0d8c6c 0%, #13a885 100%);
-                    transform: scale(1.05);
-                    box-shadow: 0 4px 12px rgba(16, 163, 127, 0.4);
-                }
-                
-                .send-button:active:not(:disabled) {
-                    transform: scale(0.95);
-                }
-                
-                .send-button:disabled {
-                    opacity: 0.5;
-                    cursor: not-allowed;
-                }
-                
-                .loading-dots {
-                    display: none;
-                }
-                
-                .loading-dots.active {
-                    display: flex;
-                    gap: 4px;
-                    align-items: center;
-                    justify-content: center;
-                }
-                
-                .loading-dot {
-                    width: 6px;
-                    height: 6px;
-                    background: white;
-                    border-radius: 50%;
-                    animation: bounce 1.4s infinite ease-in-out both;
-                }
-                
-                .loading-dot:nth-child(1) {
-                    animation-delay: -0.32s;
-                }
-                
-                .loading-dot:nth-child(2) {
-                    animation-delay: -0.16s;
-                }
-                
-                @keyframes bounce {
-                    0%, 80%, 100% {
-                        transform: scale(0);
-                        opacity: 0.5;
-                    }
-                    40% {
-                        transform: scale(1);
-                        opacity: 1;
-                    }
-                }
-                
-                .cart-sidebar {
-                    width: 360px;
-                    background: #171717;
-                    border-left: 1px solid #2f3336;
-                    display: flex;
-                    flex-direction: column;
-                }
-                
-                .cart-header {
-                    padding: 24px 20px;
-                    border-bottom: 1px solid #2f3336;
-                }
-                
-                .cart-title {
-                    font-size: 16px;
-                    font-weight: 600;
-                    color: #e7eaed;
-                    display: flex;
-                    align-items: center;
-                    gap: 10px;
-                    margin-bottom: 8px;
-                }
-                
-                .cart-count {
-                    font-size: 12px;
-                    color: #8b98a5;
-                }
-                
-                .cart-items {
-                    flex: 1;
-                    overflow-y: auto;
-                    padding: 20px;
-                }
-                
-                .cart-empty {
-                    text-align: center;
-                    color: #8b98a5;
-                    padding: 80px 20px;
-                    font-size: 13px;
-                    line-height: 1.8;
-                }
-                
-                .cart-empty-icon {
-                    font-size: 48px;
-                    margin-bottom: 16px;
-                    opacity: 0.5;
-                }
-                
-                .cart-item {
-                    background: #2f3336;
-                    border-radius: 12px;
-                    padding: 16px;
-                    margin-bottom: 12px;
-                    transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-                    border: 1px solid transparent;
-                    animation: slideIn 0.3s ease-out;
-                }
-                
-                @keyframes slideIn {
-                    from {
-                        opacity: 0;
-                        transform: translateX(20px);
-                    }
-                    to {
-                        opacity: 1;
-                        transform: translateX(0);
-                    }
-                }
-                
-                .cart-item:hover {
-                    background: #3a3f44;
-                    border-color: #10a37f;
-                    transform: translateX(-4px);
-                    box-shadow: 4px 0 12px rgba(16, 163, 127, 0.2);
-                }
-                
-                .cart-item-header {
-                    display: flex;
-                    align-items: center;
-                    gap: 14px;
-                    margin-bottom: 12px;
-                }
-                
-                .cart-item-emoji {
-                    font-size: 28px;
-                }
-                
-                .cart-item-info {
-                    flex: 1;
-                }
-                
-                .cart-item-name {
-                    font-size: 14px;
-                    font-weight: 600;
-                    color: #e7eaed;
-                    margin-bottom: 4px;
-                }
-                
-                .cart-item-price {
-                    font-size: 13px;
-                    color: #10a37f;
-                    font-weight: 600;
-                }
-                
-                .cart-item-controls {
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                    gap: 14px;
-                }
-                
-                .qty-button {
-                    width: 32px;
-                    height: 32px;
-                    background: #3a3f44;
-                    color: #e7eaed;
-                    border: none;
-                    border-radius: 8px;
-                    cursor: pointer;
-                    font-size: 16px;
-                    font-weight: 600;
-                    transition: all 0.2s;
-                    display: flex;
-                    align-items: center;
-                    justify-content: center;
-                }
-                
-                .qty-button:hover {
-                    background: #10a37f;
-                    color: white;
-                    transform: scale(1.1);
-                }
-                
-                .qty-button:active {
-                    transform: scale(0.95);
-                }
-                
-                .qty-value {
-                    font-size: 15px;
-                    font-weight: 600;
-                    color: #e7eaed;
-                    min-width: 28px;
-                    text-align: center;
-                }
-                
-                .cart-footer {
-                    padding: 20px;
-                    border-top: 1px solid #2f3336;
-                    background: #1a1a1a;
-                }
-                
-                .cart-total {
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    margin-bottom: 16px;
-                }
-                
-                .total-label {
-                    font-size: 14px;
-                    color: #8b98a5;
-                    font-weight: 500;
-                }
-                
-                .total-amount {
-                    font-size: 20px;
-                    color: #10a37f;
-                    font-weight: 700;
-                }
-                
-                .checkout-button {
-                    width: 100%;
-                    padding: 14px;
-                    background: linear-gradient(135deg, #10a37f 0%, #16c79a 100%);
-                    color: white;
-                    border: none;
-                    border-radius: 10px;
-                    font-size: 14px;
-                    font-weight: 600;
-                    cursor: pointer;
-                    transition: all 0.2s;
-                    box-shadow: 0 4px 12px rgba(16, 163, 127, 0.3);
-                }
-                
-                .checkout-button:hover {
-                    transform: translateY(-2px);
-                    box-shadow: 0 6px 16px rgba(16, 163, 127, 0.4);
-                }
-                
-                .checkout-button:active {
-                    transform: translateY(0);
-                }
-                
-                @keyframes fadeIn {
-                    from {
-                        opacity: 0;
-                        transform: translateY(10px);
-                    }
-                    to {
-                        opacity: 1;
-                        transform: translateY(0);
-                    }
-                }
-                
-                .chat-messages::-webkit-scrollbar,
-                .cart-items::-webkit-scrollbar {
-                    width: 8px;
-                }
-                
-                .chat-messages::-webkit-scrollbar-track,
-                .cart-items::-webkit-scrollbar-track {
-                    background: transparent;
-                }
-                
-                .chat-messages::-webkit-scrollbar-thumb,
-                .cart-items::-webkit-scrollbar-thumb {
-                    background: #3a3f44;
-                    border-radius: 4px;
-                }
-                
-                .chat-messages::-webkit-scrollbar-thumb:hover,
-                .cart-items::-webkit-scrollbar-thumb:hover {
-                    background: #4a5056;
-                }
-            """)
+            Link(rel="stylesheet", href=static_url("app.css")),
+            Script(src="https://unpkg.com/htmx.org@1.9.10"),
+            Script(src="https://unpkg.com/htmx.org@1.9.10/dist/ext/sse.js"),
+            Script(src=static_url("app.js"))
         ),
         Body(
             Div(
@@ -807,7 +222,8 @@ def get(request: Request):
                         cls="chat-messages",
                         hx_get="/messages",
                         hx_trigger="load",
-                        hx_swap="innerHTML"
+                        hx_swap="innerHTML",
+                        **{"hx-on::after-swap": "afterMessagesLoad(event)"}
                     ),
                     Div(
                         Form(
@@ -836,92 +252,13 @@ def get(request: Request):
                                 cls="input-wrapper",
                                 id="input-wrapper"
                             ),
-                            hx_post="/send",
+                            hx_post="/send/stream" if STREAMING else "/send",
                             hx_target="#chat-messages",
                             hx_swap="innerHTML",
                             hx_indicator="#loading-indicator",
                             **{
-                                "hx-on::before-request": """
-                                    const input = document.getElementById('message-input');
-                                    const wrapper = document.getElementById('input-wrapper');
-                                    const sendBtn = document.getElementById('send-button');
-                                    const sendIcon = document.getElementById('send-icon');
-                                    const loadingDots = document.getElementById('loading-dots');
-                                    const chatMessages = document.getElementById('chat-messages');
-                                    
-                                    if (!input.value.trim()) {
-                                        event.preventDefault();
-                                        return false;
-                                    }
-                                    
-                                    // Disable input
-                                    input.disabled = true;
-                                    sendBtn.disabled = true;
-                                    wrapper.classList.add('loading');
-                                    
-                                    // Show loading animation
-                                    sendIcon.style.display = 'none';
-                                    loadingDots.classList.add('active');
-                                    
-                                    // Clear welcome screen if it exists
-                                    const welcomeMsg = chatMessages.querySelector('.welcome-message');
-                                    if (welcomeMsg) {
-                                        chatMessages.innerHTML = '';
-                                    }
-                                    
-                                    // Add user message immediately
-                                    const userMsg = document.createElement('div');
-                                    userMsg.className = 'message-wrapper user';
-                                    userMsg.style.animation = 'fadeIn 0.3s';
-                                    userMsg.innerHTML = `
-                                        <div class="avatar user">U</div>
-                                        <div class="message-content">
-                                            <div class="message-text">${input.value}</div>
-                                        </div>
-                                    `;
-                                    chatMessages.appendChild(userMsg);
-                                    
-                                    // Show typing indicator
-                                    const typingIndicator = document.createElement('div');
-                                    typingIndicator.id = 'typing-indicator';
-                                    typingIndicator.className = 'typing-indicator';
-                                    typingIndicator.innerHTML = `
-                                        <div class="avatar bot">AI</div>
-                                        <div class="message-content">
-                                            <div class="message-text">
-                                                <div class="typing-dot"></div>
-                                                <div class="typing-dot"></div>
-                                                <div class="typing-dot"></div>
-                                            </div>
-                                        </div>
-                                    `;
-                                    chatMessages.appendChild(typingIndicator);
-                                    chatMessages.scrollTop = chatMessages.scrollHeight;
-                                """,
-                                "hx-on::after-request": """
-                                    const input = document.getElementById('message-input');
-                                    const wrapper = document.getElementById('input-wrapper');
-                                    const sendBtn = document.getElementById('send-button');
-                                    const sendIcon = document.getElementById('send-icon');
-                                    const loadingDots = document.getElementById('loading-dots');
-                                    const chatMessages = document.getElementById('chat-messages');
-                                    
-                                    // Re-enable input
-                                    input.disabled = false;
-                                    sendBtn.disabled = false;
-                                    wrapper.classList.remove('loading');
-                                    input.value = '';
-                                    
-                                    // Hide loading animation
-                                    sendIcon.style.display = 'block';
-                                    loadingDots.classList.remove('active');
-                                    
-                                    // Scroll to bottom
-                                    chatMessages.scrollTop = chatMessages.scrollHeight;
-                                    
-                                    // Focus input
-                                    input.focus();
-                                """
+                                "hx-on::before-request": "beforeSend(event)",
+                                "hx-on::after-request": "afterSend(event)"
                             }
                         ),
                         cls="chat-input-container"
@@ -958,23 +295,48 @@ def get(request: Request):
                     cls="cart-sidebar"
                 ),
                 cls="main-wrapper"
-            ),
-            Script(src="https://unpkg.com/htmx.org@1.9.10")
+            )
         )
     )
+
+PAGE_HTML = "<!doctype html>\n" + to_xml(page_shell())
+PAGE_ETAG = '"' + hashlib.sha256(PAGE_HTML.encode()).hexdigest()[:16] + '"'
+
+@rt("/")
+def get(request: Request):
+    """Main chat page"""
+    session_id = get_session_id(request)
     
-    # Set cookie using FastHTML's built-in response handling
-    from fasthtml.common import cookie
-    return response, cookie("session_id", session_id, max_age=86400*30)
+    # The shell is pre-rendered; only the session cookie is per request
+    if request.headers.get("if-none-match") == PAGE_ETAG:
+        response = Response(status_code=304)
+    else:
+        response = HTMLResponse(PAGE_HTML)
+    response.headers["ETag"] = PAGE_ETAG
+    response.headers["Cache-Control"] = "no-cache"
+    response.set_cookie("session_id", session_id, max_age=86400*30)
+    return response
+
+@rt("/static/{fname}")
+def get(request: Request, fname: str):
+    """Serve a static asset with ETag and long-lived cache headers"""
+    asset = STATIC_ASSETS.get(fname)
+    if asset is None:
+        return Response(status_code=404)
+    body, media_type, etag = asset
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
 
 @rt("/messages")
-def get(request: Request):
-    """Get all messages"""
+async def get(request: Request, before: int = None):
+    """Newest page of messages, or the page older than the `before` cursor"""
     session_id = get_session_id(request)
-    session_data = get_session_data(session_id)
+    session_data = await get_session_data(session_id)
     messages = session_data['messages']
     
-    if not messages:
+    if not messages and before is None:
         return Div(
             Div("🛍️", cls="welcome-icon"),
             Div("Welcome to AI Shopping Assistant", cls="welcome-title"),
@@ -1005,87 +367,99 @@ def get(request: Request):
             cls="welcome-message"
         )
     
-    result = []
-    for msg in messages:
-        result.append(ChatMessage(msg['text'], is_user=msg['is_user']))
-    return result
+    rows, older = await asyncio.to_thread(messages.page, before)  # older pages read SQLite
+    result = [ChatMessage(text, is_user=is_user) for _, text, is_user in rows]
+    if older is not None:
+        result.insert(0, LoadOlderMessages(older))
+    return render(result)
+
+def expire_pending_turns(session_data):
+    """Drop streamed turns whose /stream was never opened (tab closed, request lost)"""
+    pending = session_data['pending_turns']
+    cutoff = time.time() - PENDING_TURN_TTL
+    for turn_id in [turn_id for turn_id, turn in pending.items() if turn['started'] < cutoff]:
+        del pending[turn_id]
+
+def handle_local_turn(session_data, message, changes):
+    """Record the user message and answer clear/fast-path commands locally.
+
+    Returns the bot response, or None when the message needs the agent.
+    Repeated informational questions are answered from the answer cache.
+    Cart lines touched are recorded in `changes` (see Cart.apply).
+    """
+    messages = session_data['messages']
+    messages.append(message, is_user=True)
+    expire_pending_turns(session_data)
+    
+    # Check for clear command
+    if message.lower().strip() in ["clear", "clear chat", "reset"]:
+        messages.clear()
+        session_data['agent_message_history'] = []
+        bot_response = "Chat cleared! How can I help you?"
+        messages.append(bot_response, is_user=False)
+        return bot_response
+    
+    cart_action = try_fast_path(message)
+    if cart_action:
+        # Deterministic command - apply directly without a model round trip
+        cart = session_data['cart']
+        in_cart = cart_action["product"] in cart
+        if in_cart or cart_action["action"] == "add" or cart_action["quantity"] > 0:
+            cart.apply(cart_action, changes)
+        bot_response = describe_cart_action(cart_action, in_cart)
+        session_data['agent_message_history'] = session_data['agent_message_history'] + fast_path_messages(message, bot_response)
+        messages.append(bot_response, is_user=False)
+        return bot_response
+    
+    cached = answer_cache.get(message, catalog, session_data['cart'], session_data['agent_message_history'])
+    if cached is not None:
+        # Same question about the same catalog and cart - reuse the earlier answer
+        session_data['agent_message_history'] = session_data['agent_message_history'] + fast_path_messages(message, cached)
+        messages.append(cached, is_user=False)
+        return cached
+    
+    return None
+
+def cart_oob(session_data, changes):
+    """Out-of-band cart sidebar update covering only the lines in `changes`"""
+    cart = session_data['cart']
+    if not cart or len(cart) == sum(1 for existed in changes.values() if not existed):
+        # Empty <-> non-empty transitions swap the placeholder, so redraw the whole list
+        return [Div(*get_cart_items(session_data), id="cart-items", **{"hx-swap-oob": "innerHTML"})]
+    return cart_item_fragments(cart, changes, oob=True) + cart_totals_oob(cart)
 
 @rt("/send")
 async def post(request: Request, message: str):
     """Handle message submission"""
     session_id = get_session_id(request)
-    session_data = get_session_data(session_id)
-    messages = session_data['messages']
-    agent_message_history = session_data['agent_message_history']
-    cart = session_data['cart']
     
     bot_response = ""
+    changes = {}
     
-    if message.strip():
-        messages.append({"text": message, "is_user": True})
+    async with session_locks.hold(session_id):
+        session_data = await get_session_data(session_id)
+        messages = session_data['messages']
         
-        # Check for clear command
-        if message.lower().strip() in ["clear", "clear chat", "reset"]:
-            messages.clear()
-            session_data['agent_message_history'] = []
-            bot_response = "Chat cleared! How can I help you?"
-            messages.append({"text": bot_response, "is_user": False})
-        else:
-            # Use Pydantic agent for response
-            try:
-                result = await run_agent_with_logging(message, agent_message_history)
-                bot_response = result.output
-                
-                # Get the new messages from this interaction only
-                new_messages = result.new_messages()
-                
-                # Process tool calls for cart actions (only from new messages)
-                import json
-                for msg in new_messages:
-                    if hasattr(msg, 'parts'):
-                        for part in msg.parts:
-                            if part.__class__.__name__ == 'ToolReturnPart':
-                                try:
-                                    cart_action = json.loads(part.content)
-                                    action = cart_action.get('action')
-                                    product_name = cart_action.get('product')
-                                    quantity = cart_action.get('quantity', 1)
-                                    price = cart_action.get('price', 0)
-                                    emoji = cart_action.get('emoji', '📦')
-                                    
-                                    if action == 'add':
-                                        if product_name in cart:
-                                            cart[product_name]['quantity'] += quantity
-                                        else:
-                                            cart[product_name] = {
-                                                'quantity': quantity,
-                                                'price': price,
-                                                'emoji': emoji
-                                            }
-                                    elif action == 'remove':
-                                        cart.pop(product_name, None)
-                                    elif action == 'update':
-                                        if quantity > 0:
-                                            if product_name in cart:
-                                                cart[product_name]['quantity'] = quantity
-                                            else:
-                                                cart[product_name] = {
-                                                    'quantity': quantity,
-                                                    'price': price,
-                                                    'emoji': emoji
-                                                }
-                                        else:
-                                            cart.pop(product_name, None)
-                                except (json.JSONDecodeError, AttributeError, KeyError):
-                                    pass
-                
-                # Update message history with all messages
-                session_data['agent_message_history'] = result.all_messages()
-                
-                messages.append({"text": bot_response, "is_user": False})
-            except Exception as e:
-                bot_response = f"Sorry, I encountered an error: {str(e)}"
-                messages.append({"text": bot_response, "is_user": False})
+        if message.strip():
+            bot_response = handle_local_turn(session_data, message, changes)
+            if bot_response is None:
+                # Use Pydantic agent for response
+                try:
+                    # manage_cart applies cart changes directly through the run's deps
+                    deps = CartDeps(cart=session_data['cart'], changes=changes)
+                    history = session_data['agent_message_history']
+                    result = await run_agent_with_logging(message, history, deps)
+                    bot_response = result.output
+                    
+                    # Update message history with all messages
+                    session_data['agent_message_history'] = result.all_messages()
+                    answer_cache.put(message, catalog, session_data['cart'], history, bot_response, result.new_messages())
+                    
+                    messages.append(bot_response, is_user=False)
+                except Exception as e:
+                    bot_response = f"Sorry, I encountered an error: {str(e)}"
+                    messages.append(bot_response, is_user=False)
+            await save_session_data(session_id, session_data)
     
     # Return user message and bot response
     result = [
@@ -1093,69 +467,178 @@ async def post(request: Request, message: str):
         ChatMessage(bot_response, is_user=False)
     ]
     
-    # Add OOB cart update
-    cart_div = Div(*get_cart_items(cart), id="cart-items", **{"hx-swap-oob": "innerHTML"})
-    result.append(cart_div)
+    # Add OOB cart update for the lines that changed
+    if changes:
+        with phase('cart_update'):
+            result += cart_oob(session_data, changes)
+    
+    return render(result)
+
+@rt("/send/stream")
+async def post(request: Request, message: str):
+    """Handle message submission, streaming the agent's reply over SSE"""
+    session_id = get_session_id(request)
+    
+    bot_response = ""
+    changes = {}
+    async with session_locks.hold(session_id):
+        session_data = await get_session_data(session_id)
+        if message.strip():
+            bot_response = handle_local_turn(session_data, message, changes)
+            if bot_response is None:
+                # Hand the turn to /stream; the browser connects as soon as this renders
+                turn_id = uuid.uuid4().hex
+                session_data['pending_turns'][turn_id] = {"message": message, "started": time.time()}
+                await save_session_data(session_id, session_data)
+                return render([ChatMessage(message, is_user=True), StreamingChatMessage(turn_id)])
+            await save_session_data(session_id, session_data)
     
-    return result
+    result = [ChatMessage(message, is_user=True), ChatMessage(bot_response, is_user=False)]
+    if changes:
+        with phase('cart_update'):
+            result += cart_oob(session_data, changes)
+    return render(result)
+
+async def stream_turn(session_id, turn):
+    """Run the agent for a pending turn and yield SSE events"""
+    bot_response = ""
+    ttft_ms = None
+    
+    # Hold the session for the whole run; reload so changes made since /send/stream are kept
+    async with session_locks.hold(session_id):
+        session_data = await get_session_data(session_id)
+        deps = CartDeps(cart=session_data['cart'])
+        history = session_data['agent_message_history']
+        try:
+            async for kind, value in stream_agent_with_logging(turn['message'], history, deps):
+                if kind == "text":
+                    if ttft_ms is None:
+                        ttft_ms = (time.time() - turn['started']) * 1000
+                    bot_response += value
+                    yield sse_message(Span(value), event="chunk")
+                elif kind == "tool_result" and deps.changes:
+                    # One sidebar update per manage_cart / manage_cart_bulk return, while the run goes on
+                    yield sse_message(Div(*cart_oob(session_data, deps.changes)), event="cart")
+                    deps.changes = {}
+                elif kind == "done":
+                    session_data['agent_message_history'] = value.all_messages()
+                    answer_cache.put(turn['message'], catalog, session_data['cart'], history, bot_response, value.new_messages())
+        except Exception as e:
+            bot_response = f"Sorry, I encountered an error: {str(e)}"
+            yield sse_message(Span(bot_response), event="chunk")
+        
+        session_data['messages'].append(bot_response, is_user=False)
+        await save_session_data(session_id, session_data)
+    
+    total_ms = (time.time() - turn['started']) * 1000
+    import logfire
+    logfire.info('Streamed response', ttft_ms=ttft_ms, total_ms=total_ms)
+    yield sse_message(Div(data_ttft_ms=f"{ttft_ms:.0f}" if ttft_ms is not None else ""), event="done")
+
+@rt("/stream/{turn_id}")
+async def get(request: Request, turn_id: str):
+    """SSE stream of the bot response for a pending turn"""
+    session_id = get_session_id(request)
+    async with session_locks.hold(session_id):
+        session_data = await get_session_data(session_id)
+        turn = session_data['pending_turns'].pop(turn_id, None)
+        if turn is None:
+            # Already streamed (e.g. EventSource reconnect) - 204 stops the client retrying
+            return Response(status_code=204)
+        await save_session_data(session_id, session_data)
+    return EventStream(stream_turn(session_id, turn))
 
 @rt("/cart/increase/{name}")
-def post(request: Request, name: str):
+async def post(request: Request, name: str):
     """Increase cart item quantity"""
     session_id = get_session_id(request)
-    session_data = get_session_data(session_id)
-    cart = session_data['cart']
-    
-    if name in cart:
-        cart[name]['quantity'] += 1
-    return get_cart_items(cart)
+    async with session_locks.hold(session_id):
+        session_data = await get_session_data(session_id)
+        cart = session_data['cart']
+        
+        if name in cart:
+            cart.set_quantity(name, cart.get(name).quantity + 1)
+            await save_session_data(session_id, session_data)
+        with phase('cart_update'):
+            result = cart_item_response(session_data, name)
+    return render(result)
 
 @rt("/cart/decrease/{name}")
-def post(request: Request, name: str):
+async def post(request: Request, name: str):
     """Decrease cart item quantity"""
     session_id = get_session_id(request)
-    session_data = get_session_data(session_id)
-    cart = session_data['cart']
-    
-    if name in cart:
-        cart[name]['quantity'] -= 1
-        if cart[name]['quantity'] <= 0:
-            del cart[name]
-    return get_cart_items(cart)
+    async with session_locks.hold(session_id):
+        session_data = await get_session_data(session_id)
+        cart = session_data['cart']
+        
+        if name in cart:
+            cart.set_quantity(name, cart.get(name).quantity - 1)
+            await save_session_data(session_id, session_data)
+        with phase('cart_update'):
+            result = cart_item_response(session_data, name)
+    return render(result)
 
-def get_cart_items(cart):
-    """Generate cart items HTML"""
-    if not cart:
-        return [
+def EmptyCart():
+    """Placeholder shown when the cart has no items"""
+    return Div(
+        Div("🛍️", cls="cart-empty-icon"),
+        "Your cart is empty\n\nStart shopping by asking for products!",
+        cls="cart-empty"
+    )
+
+def cart_totals_oob(cart):
+    """OOB updates for the item count and the footer (total + visibility)"""
+    item_count = cart.item_count
+    count_text = f"{item_count} item{'s' if item_count != 1 else ''}" if item_count else ""
+    return [
+        Div(count_text, id="cart-count", cls="cart-count", **{"hx-swap-oob": "innerHTML"}),
+        Div(
             Div(
-                Div("🛍️", cls="cart-empty-icon"),
-                "Your cart is empty\n\nStart shopping by asking for products!",
-                cls="cart-empty"
-            )
-        ]
-    
-    items = []
-    total = 0.0
-    item_count = 0
-    
-    for name, item_data in cart.items():
-        qty = item_data['quantity']
-        price = item_data['price']
-        emoji = item_data['emoji']
-        items.append(CartItem(name, price, emoji, qty))
-        total += price * qty
-        item_count += qty
-    
-    # Add cart count update (OOB)
-    count_text = f"{item_count} item{'s' if item_count != 1 else ''}"
-    items.append(Div(count_text, id="cart-count", cls="cart-count", **{"hx-swap-oob": "innerHTML"}))
-    
-    # Add total amount update (OOB)
-    items.append(Div(f"${total:.2f}", id="total-amount", cls="total-amount", **{"hx-swap-oob": "innerHTML"}))
-    
-    # Show footer (OOB)
-    items.append(Div(id="cart-footer", style="display: block;", **{"hx-swap-oob": "outerHTML"}))
-    
-    return items
+                Div("Total", cls="total-label"),
+                Div(f"${cart.total:.2f}", id="total-amount", cls="total-amount"),
+                cls="cart-total"
+            ),
+            Button("Checkout", cls="checkout-button"),
+            id="cart-footer",
+            cls="cart-footer",
+            style=f"display: {'block' if item_count else 'none'};",
+            **{"hx-swap-oob": "outerHTML"}
+        )
+    ]
+
+def cart_item_fragments(cart, changes, oob=False):
+    """Fragments for changed cart lines: updated in place, appended or deleted"""
+    fragments = []
+    for name, existed in changes.items():
+        line = cart.get(name)
+        if line is None:
+            if existed and oob:
+                fragments.append(Div(id=cart_item_id(name), **{"hx-swap-oob": "delete"}))
+        elif existed:
+            fragments.append(CartItem(name, line.price, line.emoji, line.quantity, **({"hx-swap-oob": "true"} if oob else {})))
+        else:
+            fragments.append(Div(CartItem(name, line.price, line.emoji, line.quantity), **{"hx-swap-oob": "beforeend:#cart-items"}))
+    return fragments
+
+def cart_item_response(session_data, name):
+    """Response to a +/- click: the changed line (swapped in place) plus totals"""
+    cart = session_data['cart']
+    totals = cart_totals_oob(cart)
+    if not cart:
+        # Last line removed - show the empty placeholder instead
+        return [Div(EmptyCart(), id="cart-items", **{"hx-swap-oob": "innerHTML"})] + totals
+    # An empty main response removes the line when its quantity reaches 0
+    return cart_item_fragments(cart, {name: True}) + totals
+
+@rt("/metrics")
+def get():
+    """Prometheus-style metrics: per-phase and per-route latency histograms plus the stats counters"""
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4")
+
+def get_cart_items(session_data):
+    """Generate the full cart items HTML"""
+    cart = session_data['cart']
+    items = [CartItem(line.name, line.price, line.emoji, line.quantity) for line in cart]
+    return (items or [EmptyCart()]) + cart_totals_oob(cart)
 
 serve(port=8000)
\ No newline at end of file
@@ -0,0 +1,155 @@
+import json
+import os
+import re
+from dataclasses import replace
+import logfire
+from pydantic_ai import RunContext
+from pydantic_ai.messages import (
+    ModelRequest, SystemPromptPart, UserPromptPart, TextPart, ToolCallPart,
+)
+
+# Turns kept verbatim (tool calls and all); older turns are compacted
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+# Approximate prompt-token budget for the history sent to the model
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "4000"))
+
+# Marks the summary part compaction adds, so the next compaction can replace it
+SUMMARY_PREFIX = "Summary of earlier conversation: "
+
+# Running totals across all model requests
+history_stats = {"requests": 0, "tokens_before": 0, "tokens_after": 0, "tokens_saved": 0}
+
+
+def _part_text(part) -> str:
+    if isinstance(part, ToolCallPart):
+        args = part.args if isinstance(part.args, str) else json.dumps(part.args)
+        return part.tool_name + args
+    content = getattr(part, 'content', '')
+    return content if isinstance(content, str) else str(content)
+
+
+def estimate_tokens(messages: list) -> int:
+    """Rough token count (~4 characters per token) - good enough for budgeting"""
+    return sum(len(_part_text(part)) for msg in messages for part in msg.parts) // 4
+
+
+def _is_turn_start(msg) -> bool:
+    return isinstance(msg, ModelRequest) and any(isinstance(p, UserPromptPart) for p in msg.parts)
+
+
+def _is_summary(part) -> bool:
+    return isinstance(part, SystemPromptPart) and part.content.startswith(SUMMARY_PREFIX)
+
+
+def _previous_summary(messages: list):
+    """The summary part left by an earlier compaction, if any"""
+    return next((part for msg in messages for part in msg.parts if _is_summary(part)), None)
+
+
+def split_turns(messages: list):
+    """
+    Split history into (system parts, [turn, ...]) where each turn starts with a user prompt.
+
+    pydantic-ai keeps the processed history, so a summary added by an earlier
+    compaction comes back here; it is left out of the system parts.
+    """
+    system_parts = []
+    turns = []
+    for msg in messages:
+        if isinstance(msg, ModelRequest):
+            system_parts += [p for p in msg.parts if isinstance(p, SystemPromptPart) and not _is_summary(p)]
+            parts = [p for p in msg.parts if not isinstance(p, SystemPromptPart)]
+            if not parts:
+                continue
+            msg = replace(msg, parts=parts)
+        if _is_turn_start(msg) or not turns:
+            turns.append([])
+        turns[-1].append(msg)
+    return system_parts, turns
+
+
+def _strip_tool_parts(turn: list) -> list:
+    """Drop tool call/return parts from a turn, keeping the user's and the model's text"""
+    compacted = []
+    for msg in turn:
+        parts = [p for p in msg.parts if isinstance(p, (UserPromptPart, TextPart))]
+        if parts:
+            compacted.append(replace(msg, parts=parts))
+    return compacted
+
+
+def _summary_part(cart, dropped_turns: int):
+    lines = []
+    if cart:
+        items = ", ".join(f"{line.name} x{line.quantity}" for line in cart)
+        lines.append(f"Current cart: {items}.")
+    if dropped_turns:
+        lines.append(f"{dropped_turns} older turn(s) were omitted to save space.")
+    if not lines:
+        return None
+    return SystemPromptPart(content=SUMMARY_PREFIX + " ".join(lines))
+
+
+def compact_messages(messages: list, cart=None, keep_turns: int = HISTORY_KEEP_TURNS,
+                     token_budget: int = HISTORY_TOKEN_BUDGET) -> list:
+    """
+    Keep the last `keep_turns` turns verbatim, strip tool call/return pairs
+    from older turns, and drop the oldest turns until the history fits
+    `token_budget`. The system prompt and the current turn are always kept.
+
+    One summary part stands in for what was removed: the session's current
+    `cart` (which also reflects fast-path and +/- changes) and how many turns
+    were dropped. It replaces the summary from any earlier compaction.
+    """
+    system_parts, turns = split_turns(messages)
+    previous = _previous_summary(messages)
+    # A previous summary is always rebuilt so its cart line stays current
+    if len(turns) <= keep_turns and estimate_tokens(messages) <= token_budget and previous is None:
+        return messages
+    match = re.search(r"(\d+) older turn", previous.content) if previous else None
+    previously_dropped = int(match.group(1)) if match else 0
+
+    # The last turn may be mid tool call, so it is always kept verbatim
+    keep_turns = max(keep_turns, 1)
+    old, recent = turns[:-keep_turns], turns[-keep_turns:]
+    old = [_strip_tool_parts(turn) for turn in old]
+    old = [turn for turn in old if turn]
+
+    def build(old_turns, recent_turns, dropped):
+        flat = [msg for turn in old_turns + recent_turns for msg in turn]
+        head = list(system_parts)
+        summary = _summary_part(cart, previously_dropped + dropped)
+        if summary:
+            head.append(summary)
+        if head and flat and isinstance(flat[0], ModelRequest):
+            flat[0] = replace(flat[0], parts=head + list(flat[0].parts))
+        elif head:
+            flat.insert(0, ModelRequest(parts=head))
+        return flat
+
+    dropped = 0
+    compacted = build(old, recent, dropped)
+    # Enforce the budget: oldest compacted turns go first, then old verbatim turns
+    while estimate_tokens(compacted) > token_budget and len(old) + len(recent) > 1:
+        if old:
+            old = old[1:]
+        else:
+            recent = recent[1:]
+        dropped += 1
+        compacted = build(old, recent, dropped)
+    return compacted
+
+
+def compact_history(ctx: RunContext, messages: list) -> list:
+    """pydantic-ai history processor: compact the history and record tokens saved"""
+    compacted = compact_messages(messages, getattr(ctx.deps, 'cart', None))
+    before = estimate_tokens(messages)
+    after = estimate_tokens(compacted) if compacted is not messages else before
+    history_stats["requests"] += 1
+    history_stats["tokens_before"] += before
+    history_stats["tokens_after"] += after
+    history_stats["tokens_saved"] += before - after
+    if compacted is not messages:
+        logfire.info('History compacted', tokens_before=before, tokens_after=after,
+                     tokens_saved=before - after, messages_before=len(messages), messages_after=len(compacted))
+    return compacted
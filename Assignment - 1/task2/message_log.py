@@ -0,0 +1,71 @@
+import os
+
+# Messages rendered per /messages page (and kept in memory after a SQLite load)
+MESSAGES_PAGE_SIZE = int(os.getenv("MESSAGES_PAGE_SIZE", 50))
+
+
+class MessageLog:
+    """
+    Append-only chat log with O(1) appends and tail reads.
+
+    Messages are (text, is_user) pairs numbered by a per-session sequence that
+    never goes back, so a sequence number works as a pagination cursor. Only a
+    tail may be held in memory: older pages come from `loader(begin, end)`,
+    which the SQLite store sets up to read its messages table.
+    """
+
+    __slots__ = ('start', 'base', 'saved', 'loader', '_items')
+
+    def __init__(self, items=(), start: int = 0, base: int = None, saved: int = None, loader=None):
+        self._items = list(items)
+        self.start = start                                 # first sequence number since the last clear
+        self.base = start if base is None else base        # sequence number of _items[0]
+        self.saved = start if saved is None else saved     # first sequence number not yet persisted
+        self.loader = loader
+
+    @property
+    def next_seq(self) -> int:
+        return self.base + len(self._items)
+
+    def __len__(self):
+        return self.next_seq - self.start
+
+    def __bool__(self):
+        return self.next_seq > self.start
+
+    def append(self, text: str, is_user: bool) -> None:
+        self._items.append((text, is_user))
+
+    def clear(self) -> None:
+        """Start a new conversation; earlier sequence numbers are never reused"""
+        self.start = self.base = self.next_seq
+        self._items = []
+
+    def unsaved(self) -> list:
+        """(seq, text, is_user) rows appended since the last mark_saved()"""
+        first = max(self.saved, self.base)
+        return [(first + i, text, is_user) for i, (text, is_user) in enumerate(self._items[first - self.base:])]
+
+    def mark_saved(self) -> None:
+        self.saved = self.next_seq
+
+    def page(self, before: int = None, limit: int = MESSAGES_PAGE_SIZE):
+        """
+        Up to `limit` messages preceding the `before` cursor (newest page if None).
+
+        Returns ([(seq, text, is_user), ...] oldest first, cursor for the next
+        older page or None when this page reaches the start).
+        """
+        end = self.next_seq if before is None else max(min(before, self.next_seq), self.start)
+        begin = max(self.start, end - limit)
+        rows = []
+        if begin < self.base:
+            rows = self.loader(begin, min(end, self.base)) if self.loader else []
+        first = max(begin, self.base)
+        rows += [(first + i, text, is_user) for i, (text, is_user) in enumerate(self._items[first - self.base:end - self.base])]
+        return rows, (begin if begin > self.start else None)
+
+    @classmethod
+    def from_list(cls, messages: list) -> 'MessageLog':
+        """Build from the old list of {"text", "is_user"} dicts"""
+        return cls((m['text'], m['is_user']) for m in messages)
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+import numpy as np
+
+# Where the index is persisted; one set of files per catalog version
+PRODUCT_INDEX_DIR = Path(os.getenv("PRODUCT_INDEX_DIR") or Path(__file__).with_name(".product_index"))
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> list:
+    """Lower-case word tokens with simple plurals folded ("brushes" -> "brush")"""
+    tokens = []
+    for word in re.findall(r"[^\W_]+", text.casefold()):
+        if word.endswith(("shes", "ches", "sses", "xes", "zes")):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+class ProductIndex:
+    """
+    BM25 index over product names, stored as CSR postings in NumPy arrays.
+
+    For term id t, `docs[offsets[t]:offsets[t + 1]]` are the products containing
+    it and `weights[...]` their precomputed BM25 scores, so a query is a few
+    vectorized scatter-adds into one score array. Doc ids are positions in
+    `catalog.products`; the arrays are memory-mapped when loaded from disk.
+    """
+
+    def __init__(self, terms: dict, offsets, docs, weights, n_docs: int):
+        self.terms = terms
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+        self.n_docs = n_docs
+
+    @classmethod
+    def build(cls, products: list) -> "ProductIndex":
+        terms = {}
+        postings = []  # (term id, doc id, term frequency)
+        lengths = np.empty(len(products), dtype=np.float32)
+        for doc, product in enumerate(products):
+            tokens = tokenize(product["name"])
+            lengths[doc] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.append((terms.setdefault(term, len(terms)), doc, tf))
+
+        table = np.array(postings, dtype=np.int64).reshape(-1, 3)
+        table = table[np.lexsort((table[:, 1], table[:, 0]))]
+        term_ids, docs, tf = table[:, 0], table[:, 1].astype(np.int32), table[:, 2].astype(np.float32)
+        df = np.bincount(term_ids, minlength=len(terms))
+        offsets = np.concatenate(([0], np.cumsum(df))).astype(np.int64)
+
+        n_docs = len(products)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avgdl = float(lengths.mean()) if n_docs else 1.0
+        norm = K1 * (1 - B + B * lengths[docs] / avgdl)
+        weights = (idf[term_ids] * tf * (K1 + 1) / (tf + norm)).astype(np.float32)
+        return cls(terms, offsets, docs, weights, n_docs)
+
+    def save(self, directory: Path, version: str) -> None:
+        """Write the arrays and vocabulary; the vocabulary goes last and marks the index complete"""
+        directory.mkdir(parents=True, exist_ok=True)
+        for stale in directory.glob("*"):
+            if not stale.name.startswith(version):
+                stale.unlink(missing_ok=True)
+        for name in ("offsets", "docs", "weights"):
+            tmp = directory / f"{version}.{name}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, getattr(self, name))
+            os.replace(tmp, directory / f"{version}.{name}.npy")
+        tmp = directory / f"{version}.terms.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps({"n_docs": self.n_docs, "terms": list(self.terms)}))
+        os.replace(tmp, directory / f"{version}.terms.json")
+
+    @classmethod
+    def load(cls, directory: Path, version: str):
+        """Memory-map a saved index, or None if there isn't one for this catalog version"""
+        meta_path = directory / f"{version}.terms.json"
+        if not meta_path.exists():
+            return None
+        meta = json.loads(meta_path.read_text())
+        arrays = {name: np.load(directory / f"{version}.{name}.npy", mmap_mode="r")
+                  for name in ("offsets", "docs", "weights")}
+        return cls({term: i for i, term in enumerate(meta["terms"])}, n_docs=meta["n_docs"], **arrays)
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """Doc ids of the best-matching products, best first"""
+        term_ids = {self.terms[t] for t in tokenize(query) if t in self.terms}
+        if not term_ids:
+            return []
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for t in term_ids:
+            start, end = self.offsets[t], self.offsets[t + 1]
+            # Each doc appears once per term, so plain fancy-index addition is safe
+            scores[self.docs[start:end]] += self.weights[start:end]
+        hits = np.flatnonzero(scores)
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit)[:limit]]
+        # Highest score first, catalog order on ties
+        return hits[np.lexsort((hits, -scores[hits]))].tolist()
+
+
+def open_index(catalog, directory: Path = PRODUCT_INDEX_DIR) -> ProductIndex:
+    """Memory-map the index for this catalog version, building and saving it first if needed"""
+    index = ProductIndex.load(directory, catalog.version)
+    if index is None:
+        index = ProductIndex.build(catalog.products)
+        try:
+            index.save(directory, catalog.version)
+        except OSError:
+            pass  # read-only deploy: keep the in-memory index
+    return index
+
+
+_index = None  # (catalog version, ProductIndex)
+_index_lock = threading.Lock()
+
+
+def current_index(catalog) -> ProductIndex:
+    """The index for this catalog version, opened (or built) once even if several searches ask at once"""
+    global _index
+    with _index_lock:
+        if _index is None or _index[0] != catalog.version:
+            _index = (catalog.version, open_index(catalog))
+        return _index[1]
+
+
+async def search_catalog(catalog, query: str, limit: int = 10) -> list:
+    """
+    Products matching a free-text query, best first.
+
+    The index is opened on the first search, in a worker thread: building it
+    for a large catalog takes a while and must not stall other sessions.
+    Misspelled queries that match no indexed word fall back to the catalog's
+    prefix/fuzzy suggestions.
+    """
+    loaded = _index
+    if loaded is not None and loaded[0] == catalog.version:
+        index = loaded[1]
+    else:
+        index = await asyncio.to_thread(current_index, catalog)
+    products = [catalog.products[i] for i in index.search(query, limit)]
+    return products or catalog.suggest(query, limit)
@@ -0,0 +1,56 @@
+"""
+Production entry point: the shopping UI under several uvicorn worker processes.
+
+Sessions are kept in the shared SQLite store (WAL mode) and per-session locks
+are extended across processes with a shared lock file, so any worker can serve
+any request. On SIGTERM/SIGINT each worker stops accepting connections, lets
+in-flight requests finish and save their sessions (up to --graceful-timeout),
+then checkpoints and closes the store.
+
+Usage:
+    python server.py --workers 4 --port 8000 [--store sqlite:sessions.db]
+
+The same setup under gunicorn:
+    SESSION_STORE=sqlite:sessions.db SESSION_LOCK_FILE=sessions.lock \\
+        gunicorn -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:8000 ecommerce_ui:app
+"""
+import argparse
+import os
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--store", default=os.getenv("SESSION_STORE", "sqlite:sessions.db"),
+                        help="session store URL; must be shared (sqlite:...) when --workers > 1")
+    parser.add_argument("--lock-file", default=os.getenv("SESSION_LOCK_FILE", "sessions.lock"))
+    parser.add_argument("--graceful-timeout", type=float, default=10,
+                        help="seconds to wait for in-flight requests on shutdown")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    if args.workers > 1 and not args.store.startswith("sqlite:"):
+        parser.error(f"--store {args.store!r} is per process; use sqlite:<path> with multiple workers")
+
+    # Read by ecommerce_ui at import time in every worker
+    os.environ["SESSION_STORE"] = args.store
+    os.environ["SESSION_LOCK_FILE"] = args.lock_file
+    os.environ["SHUTDOWN_TIMEOUT"] = str(args.graceful_timeout)
+
+    import uvicorn
+    uvicorn.run(
+        "ecommerce_ui:app",
+        app_dir=str(Path(__file__).resolve().parent),
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
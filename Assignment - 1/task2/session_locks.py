@@ -0,0 +1,111 @@
+import asyncio
+import os
+import time
+import zlib
+from contextlib import asynccontextmanager
+
+# Queue depth and wait-time metrics across all sessions
+lock_stats = {
+    "acquired": 0,
+    "contended": 0,
+    "queue_depth": 0,
+    "max_queue_depth": 0,
+    "wait_seconds_total": 0.0,
+    "max_wait_seconds": 0.0,
+}
+
+
+class SessionLocks:
+    """
+    Per-session asyncio locks.
+
+    Requests for the same session are serialized (in arrival order) while
+    different sessions run fully in parallel. Locks only exist while a session
+    has requests in flight, so idle sessions cost nothing. This serializes
+    within one worker process; SharedSessionLocks extends it across workers.
+    """
+
+    def __init__(self):
+        self._locks = {}  # session_id -> [lock, requests in flight]
+
+    def queue_depth(self, session_id: str) -> int:
+        """Requests waiting for or holding the lock for this session"""
+        entry = self._locks.get(session_id)
+        return entry[1] if entry else 0
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        entry = self._locks.setdefault(session_id, [asyncio.Lock(), 0])
+        lock = entry[0]
+        entry[1] += 1
+        lock_stats["queue_depth"] += 1
+        lock_stats["max_queue_depth"] = max(lock_stats["max_queue_depth"], lock_stats["queue_depth"])
+        if lock.locked():
+            lock_stats["contended"] += 1
+        start = time.perf_counter()
+        try:
+            async with lock:
+                waited = time.perf_counter() - start
+                lock_stats["acquired"] += 1
+                lock_stats["wait_seconds_total"] += waited
+                lock_stats["max_wait_seconds"] = max(lock_stats["max_wait_seconds"], waited)
+                yield
+        finally:
+            entry[1] -= 1
+            lock_stats["queue_depth"] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait until no session lock is held or waited on; False if `timeout` ran out first"""
+        deadline = time.monotonic() + timeout
+        while self._locks and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return not self._locks
+
+    def __len__(self):
+        return len(self._locks)
+
+
+class SharedSessionLocks(SessionLocks):
+    """
+    SessionLocks that also serialize each session across worker processes.
+
+    After the in-process lock, a request takes an exclusive POSIX record lock
+    on one byte of a shared lock file, at an offset derived from the session
+    id. Workers on the same host therefore never interleave load/save for one
+    session, whichever worker a request lands on. Unix only.
+    """
+
+    def __init__(self, path: str = "sessions.lock"):
+        super().__init__()
+        import fcntl
+        self._fcntl = fcntl
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    async def _lock_byte(self, offset: int):
+        """
+        Poll for the record lock without blocking, backing off up to 50ms.
+
+        A blocking lockf in a worker thread would keep waiting after the request
+        is cancelled and could then take the lock with nobody left to release it;
+        a cancelled poll holds nothing.
+        """
+        delay = 0.001
+        while True:
+            try:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX | self._fcntl.LOCK_NB, 1, offset)
+                return
+            except OSError:  # EAGAIN/EACCES: another worker holds it
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.05)
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        async with super().hold(session_id):
+            offset = zlib.crc32(session_id.encode())
+            await self._lock_byte(offset)
+            try:
+                yield
+            finally:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, 1, offset)
@@ -0,0 +1,233 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from cart import Cart
+from message_log import MessageLog, MESSAGES_PAGE_SIZE
+
+
+def new_session() -> dict:
+    """Fresh, empty session data"""
+    return {
+        'messages': MessageLog(),
+        'agent_message_history': [],
+        'cart': Cart(),
+        'pending_turns': {}
+    }
+
+
+def dump_history(history: list) -> bytes:
+    """Serialize ModelMessage history to compressed JSON"""
+    # pydantic-ai is imported by the first session saved with history, not at startup
+    from pydantic_ai.messages import ModelMessagesTypeAdapter
+    return zlib.compress(ModelMessagesTypeAdapter.dump_json(history), 6)
+
+
+def load_history(blob: bytes) -> list:
+    """Inverse of dump_history"""
+    from pydantic_ai.messages import ModelMessagesTypeAdapter
+    return ModelMessagesTypeAdapter.validate_json(zlib.decompress(blob))
+
+
+class SessionStore:
+    """
+    Interface for session storage backends.
+
+    Sessions are loaded lazily per request with `load` and written back with
+    `save` after the request has mutated them.
+    """
+
+    def load(self, session_id: str):
+        """Return the session data, or None if it doesn't exist (or expired)"""
+        raise NotImplementedError
+
+    def save(self, session_id: str, data: dict) -> None:
+        """Persist the session data"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        """Drop a session"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the store"""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process store with LRU eviction and a sliding TTL.
+
+    The UI calls the store from worker threads (asyncio.to_thread), so every
+    method holds a lock: per-session locks don't stop two sessions from
+    reordering or evicting entries at the same time.
+    """
+
+    def __init__(self, max_sessions: int = 10_000, ttl_seconds: float = 86400 * 30):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> (last_access, data)
+
+    def load(self, session_id: str):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            last_access, data = entry
+            now = time.monotonic()
+            if now - last_access > self.ttl_seconds:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (now, data)
+            self._sessions.move_to_end(session_id)
+            return data
+
+    def save(self, session_id: str, data: dict) -> None:
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic(), data)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    SQLite-backed store shared by every worker process on the host.
+
+    Runs in WAL mode so readers in other processes don't block writers. Agent
+    history is stored as zlib-compressed JSON, the cart as its compact
+    Cart.to_state() list, everything else as plain JSON. Chat messages live in
+    an append-only messages table: a save inserts only the new rows and a load
+    reads only the newest page, older pages are fetched on demand.
+    """
+
+    def __init__(self, path: str = "sessions.db", ttl_seconds: float = 86400 * 30):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " history BLOB NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " session_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " text TEXT NOT NULL,"
+            " is_user INTEGER NOT NULL,"
+            " PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+
+    def _message_rows(self, session_id: str, begin: int, end: int) -> list:
+        """(seq, text, is_user) rows with begin <= seq < end, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, text, is_user FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (session_id, begin, end)
+            ).fetchall()
+        return [(seq, text, bool(is_user)) for seq, text, is_user in rows]
+
+    def _load_messages(self, session_id: str, meta) -> MessageLog:
+        if isinstance(meta, list):
+            # Sessions saved before the messages table existed
+            return MessageLog.from_list(meta)
+        start, next_seq = meta['start'], meta['next']
+        tail = self._message_rows(session_id, max(start, next_seq - MESSAGES_PAGE_SIZE), next_seq)
+        return MessageLog(
+            ((text, is_user) for _, text, is_user in tail),
+            start=start, base=next_seq - len(tail), saved=next_seq,
+            loader=lambda begin, end: self._message_rows(session_id, begin, end)
+        )
+
+    def load(self, session_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, history, updated FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        data, history, updated = row
+        if time.time() - updated > self.ttl_seconds:
+            self.delete(session_id)
+            return None
+        session_data = json.loads(data)
+        session_data['cart'] = Cart.from_state(session_data['cart'])
+        session_data['messages'] = self._load_messages(session_id, session_data['messages'])
+        session_data['agent_message_history'] = load_history(history)
+        return session_data
+
+    def save(self, session_id: str, data: dict) -> None:
+        plain = {k: v for k, v in data.items() if k != 'agent_message_history'}
+        plain['cart'] = data['cart'].to_state()
+        log = data['messages']
+        plain['messages'] = {'start': log.start, 'next': log.next_seq}
+        row = (session_id, json.dumps(plain), dump_history(data['agent_message_history']), time.time())
+        new_messages = [(session_id, seq, text, int(is_user)) for seq, text, is_user in log.unsaved()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT INTO sessions (session_id, data, history, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data, "
+                    "history = excluded.history, updated = excluded.updated",
+                    row
+                )
+                if log.start:
+                    # Drop messages from before the last "clear"
+                    self._conn.execute("DELETE FROM messages WHERE session_id = ? AND seq < ?", (session_id, log.start))
+                self._conn.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)", new_messages)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        log.mark_saved()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def purge_expired(self) -> int:
+        """Delete sessions idle for longer than the TTL, returning how many were removed"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.execute("DELETE FROM messages WHERE session_id NOT IN (SELECT session_id FROM sessions)")
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            # Fold the WAL back into the main database so nothing is left in side files
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+
+
+def create_session_store(url: str) -> SessionStore:
+    """
+    Build a store from a URL-ish string.
+
+    - "memory" (default): in-process LRU+TTL store
+    - "sqlite:path/to/sessions.db": SQLite store shared across workers
+    """
+    if url == "memory":
+        return MemorySessionStore()
+    if url.startswith("sqlite:"):
+        return SqliteSessionStore(url[len("sqlite:"):] or "sessions.db")
+    raise ValueError(f"Unknown session store: {url!r}")
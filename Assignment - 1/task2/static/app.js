@@ -0,0 +1,92 @@
+// Chat handlers (wired up with hx-on in ecommerce_ui.py)
+
+function beforeSend(event) {
+    const input = document.getElementById('message-input');
+    const wrapper = document.getElementById('input-wrapper');
+    const sendBtn = document.getElementById('send-button');
+    const sendIcon = document.getElementById('send-icon');
+    const loadingDots = document.getElementById('loading-dots');
+    const chatMessages = document.getElementById('chat-messages');
+
+    if (!input.value.trim()) {
+        event.preventDefault();
+        return false;
+    }
+
+    // Disable input
+    input.disabled = true;
+    sendBtn.disabled = true;
+    wrapper.classList.add('loading');
+
+    // Show loading animation
+    sendIcon.style.display = 'none';
+    loadingDots.classList.add('active');
+
+    // Clear welcome screen if it exists
+    const welcomeMsg = chatMessages.querySelector('.welcome-message');
+    if (welcomeMsg) {
+        chatMessages.innerHTML = '';
+    }
+
+    // Add user message immediately
+    const userMsg = document.createElement('div');
+    userMsg.className = 'message-wrapper user';
+    userMsg.style.animation = 'fadeIn 0.3s';
+    userMsg.innerHTML = `
+        <div class="avatar user">U</div>
+        <div class="message-content">
+            <div class="message-text">${input.value}</div>
+        </div>
+    `;
+    chatMessages.appendChild(userMsg);
+
+    // Show typing indicator
+    const typingIndicator = document.createElement('div');
+    typingIndicator.id = 'typing-indicator';
+    typingIndicator.className = 'typing-indicator';
+    typingIndicator.innerHTML = `
+        <div class="avatar bot">AI</div>
+        <div class="message-content">
+            <div class="message-text">
+                <div class="typing-dot"></div>
+                <div class="typing-dot"></div>
+                <div class="typing-dot"></div>
+            </div>
+        </div>
+    `;
+    chatMessages.appendChild(typingIndicator);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+function afterSend(event) {
+    const input = document.getElementById('message-input');
+    const wrapper = document.getElementById('input-wrapper');
+    const sendBtn = document.getElementById('send-button');
+    const sendIcon = document.getElementById('send-icon');
+    const loadingDots = document.getElementById('loading-dots');
+    const chatMessages = document.getElementById('chat-messages');
+
+    // Re-enable input
+    input.disabled = false;
+    sendBtn.disabled = false;
+    wrapper.classList.remove('loading');
+    input.value = '';
+
+    // Hide loading animation
+    sendIcon.style.display = 'block';
+    loadingDots.classList.remove('active');
+
+    // Scroll to bottom
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+
+    // Focus input
+    input.focus();
+}
+
+function afterMessagesLoad(event) {
+    // Only the initial /messages load; older pages swap in above without moving the view
+    if (event.detail.target.id !== 'chat-messages') return;
+    const chatMessages = document.getElementById('chat-messages');
+    // Start at the newest message so the load-more sentinel isn't immediately in view
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
@@ -1,30 +1,64 @@
-from pydantic_ai import Agent, RunContext
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-import logfire
 import os
 import asyncio
-import json
-from typing import Any
+import importlib
+import sys
+import time
+from pathlib import Path
+from dataclasses import dataclass, field
+from catalog import load_catalog
+from cart import Cart
+from timing import phase, record_phase
 
 load_dotenv()
 
-# Configure Logfire
-logfire.configure()
-logfire.instrument_pydantic_ai()
-
-# Available products (same as in UI)
-AVAILABLE_PRODUCTS = [
-    {"name": "Salt", "price": 2.50, "emoji": "🧂"},
-    {"name": "Pepper", "price": 3.00, "emoji": "🌶️"},
-    {"name": "Toothpaste", "price": 4.99, "emoji": "🦷"},
-    {"name": "Toothbrush", "price": 3.50, "emoji": "🪥"},
-    {"name": "Detergent", "price": 8.99, "emoji": "🧴"},
-    {"name": "Soap", "price": 2.99, "emoji": "🧼"},
-    {"name": "Shampoo", "price": 6.99, "emoji": "🧴"},
-    {"name": "Paper Towels", "price": 5.49, "emoji": "🧻"},
-]
-
-async def manage_cart(ctx: RunContext[Any], product_name: str, action: str, quantity: int = 1, price: float = 0.0) -> str:
+sys.path.append(str(Path(__file__).resolve().parent.parent))  # shared telemetry.py
+from telemetry import ensure_telemetry
+
+if TYPE_CHECKING:
+    # Imported by build_agent(): pydantic-ai takes about a second to import
+    from pydantic_ai import Agent, RunContext
+
+# Available products, shared with the UI (products.json, or CATALOG_PATH)
+catalog = load_catalog()
+AVAILABLE_PRODUCTS = catalog.products
+
+@dataclass
+class CartDeps:
+    """Agent run dependencies: the session cart manage_cart mutates"""
+    cart: Cart
+    # Product name -> whether it was in the cart before this run touched it
+    changes: dict = field(default_factory=dict)
+
+def build_cart_action(product_name: str, action: str, quantity: int = 1, price: float = 0.0):
+    """Resolve a product against the catalog into a cart action, or None if it can't be applied"""
+    # Find product in the catalog index
+    product = catalog.match(product_name)
+
+    # If product not found and action is add or update, allow custom item
+    if not product and action in ['add', 'update']:
+        return {
+            "action": action,
+            "product": product_name,
+            "quantity": quantity,
+            "price": price if price > 0 else 5.99,  # Default price for custom items
+            "emoji": "📦",  # Default emoji for custom items
+            "custom": True,
+        }
+    elif not product and action != 'remove':
+        return None
+    return {
+        "action": action,
+        "product": product["name"] if product else product_name,
+        "quantity": quantity,
+        "price": product["price"] if product else price if price > 0 else 5.99,
+        "emoji": product["emoji"] if product else "📦",
+        "custom": False,
+    }
+
+async def manage_cart(ctx: RunContext[CartDeps], product_name: str, action: str, quantity: int = 1, price: float = 0.0) -> str:
     """
     Manage shopping cart - add, remove, or update product quantity.
     
@@ -36,80 +70,187 @@ async def manage_cart(ctx: RunContext[Any], product_name: str, action: str, quan
         price: Optional price for custom items not in the product list (default: 0.0)
         
     Returns:
-        JSON string with cart action details
+        Short confirmation of the product's quantity now in the cart
     """
-    with logfire.span('manage_cart', product_name=product_name, action=action, quantity=quantity):
-        # Find product in available list
-        product = next(
-            (p for p in AVAILABLE_PRODUCTS if p["name"].lower() == product_name.lower()),
-            None
-        )
-        
-        # If product not found and action is add or update, allow custom item
-        if not product and action in ['add', 'update']:
-            logfire.info('Managing custom product', product_name=product_name, action=action, price=price, quantity=quantity)
-            return json.dumps({
-                "action": action,
-                "product": product_name,
-                "quantity": quantity,
-                "price": price if price > 0 else 5.99,  # Default price for custom items
-                "emoji": "📦",  # Default emoji for custom items
-                "is_custom": True
-            })
-        
-        if not product and action != 'remove':
+    with phase('manage_cart', product_name=product_name, action=action, quantity=quantity) as span:
+        cart_action = build_cart_action(product_name, action, quantity, price)
+        if cart_action is None:
+            import logfire
             logfire.warn('Product not found', product_name=product_name)
-            available = ', '.join([p['name'] for p in AVAILABLE_PRODUCTS])
+            available = ', '.join(p['name'] for p in catalog.suggest(product_name) or catalog.products[:20])
             return f"Sorry, '{product_name}' is not available. Available: {available}"
-        
-        logfire.info('Cart action', product=product_name, action=action, quantity=quantity)
-        
-        # Return structured response
-        return json.dumps({
-            "action": action,
-            "product": product["name"] if product else product_name,
-            "quantity": quantity,
-            "price": product["price"] if product else price if price > 0 else 5.99,
-            "emoji": product["emoji"] if product else "📦",
-            "is_custom": False if product else True
-        })
+        if cart_action.get("custom"):
+            span.set_attribute('custom_price', price)
+
+        # Apply directly to the session's cart - no JSON round trip through the UI
+        ctx.deps.cart.apply(cart_action, ctx.deps.changes)
+        return ctx.deps.cart.line_summary(cart_action["product"])
+
+@dataclass
+class CartItem:
+    """One line-item operation for manage_cart_bulk"""
+    product_name: str
+    action: str
+    quantity: int = 1
+    price: float = 0.0
+
+async def manage_cart_bulk(ctx: RunContext[CartDeps], items: list[CartItem]) -> str:
+    """
+    Apply several cart operations at once - use this when the user asks for more than one product.
+
+    Args:
+        ctx: The run context from pydantic-ai
+        items: Operations to apply in order, each with product_name, action ('add', 'remove'
+            or 'update'), quantity (default: 1) and an optional price for custom items
+
+    Returns:
+        One confirmation line per product, or what went wrong (then nothing is changed)
+    """
+    with phase('manage_cart_bulk', items=len(items)):
+        # Resolve everything before touching the cart, so the batch applies all or nothing
+        invalid = [f"Unknown action '{item.action}' for {item.product_name}." for item in items
+                   if item.action not in ('add', 'remove', 'update')]
+        if invalid:
+            return "Nothing was changed. " + " ".join(invalid)
+        # Every action is valid here, so each item resolves (unknown products become custom items)
+        cart_actions = [build_cart_action(item.product_name, item.action, item.quantity, item.price) for item in items]
+        for cart_action in cart_actions:
+            ctx.deps.cart.apply(cart_action, ctx.deps.changes)
+        products = dict.fromkeys(cart_action["product"] for cart_action in cart_actions)
+        return "\n".join(ctx.deps.cart.line_summary(name) for name in products)
+
+async def search_products(query: str, limit: int = 10) -> str:
+    """
+    Search the product catalog.
+
+    Args:
+        query: Words describing what the user is looking for, e.g. 'shampoo' or 'green tea'
+        limit: Maximum number of products to return (default: 10)
+
+    Returns:
+        Matching products with prices, best match first, one per line
+    """
+    # Imported on the first search, not at startup, and in a worker thread so loading NumPy doesn't stall the loop
+    product_search = sys.modules.get("product_search") or await asyncio.to_thread(importlib.import_module, "product_search")
+    with phase('search_products', query=query) as span:
+        products = await product_search.search_catalog(catalog, query, min(max(limit, 1), 25))
+        span.set_attribute('results', len(products))
+        if not products:
+            return f"No products match '{query}'."
+        return "\n".join(f"{p['name']} - ${p['price']:.2f}" for p in products)
 
 model = "gemini-2.5-flash"
-agent = Agent(
-    model,
-    tools=[manage_cart],
-    system_prompt=(
-        "You are a helpful shopping assistant. Use the manage_cart tool for all cart operations:\n"
-        "- action='add' to add products (quantity defaults to 1)\n"
-        "- action='remove' to remove products from cart\n"
-        "- action='update' with the EXACT quantity parameter the user specifies to set specific quantity\n"
-        "  * When user says 'update apple to 3', use action='update' with quantity=3\n"
-        "  * When user says 'change banana quantity to 5', use action='update' with quantity=5\n"
-        "  * When user says 'set orange to 2', use action='update' with quantity=2\n"
-        "  * IMPORTANT: Use the EXACT number the user mentions in the quantity parameter\n"
-        "Available products: Salt, Pepper, Toothpaste, Toothbrush, Detergent, Soap, Shampoo, Paper Towels.\n"
-        "IMPORTANT: If a user requests an item not in the available list, you can still add it as a custom item.\n"
-        "For custom items, estimate a reasonable price (use the price parameter). If you're unsure, use $5.99 as default.\n"
-        "Be friendly and conversational in responses. Confirm the exact quantity when updating items."
+
+# Built on first use: constructing it loads the Gemini provider, and telemetry
+# (TELEMETRY=off, TELEMETRY_SAMPLE_RATE=0.1, ...) is configured alongside it
+_agent = None
+
+def get_agent() -> Agent:
+    global _agent
+    if _agent is None:
+        ensure_telemetry()
+        _agent = build_agent()
+    return _agent
+
+def __getattr__(name):
+    # `from task2 import agent` still works, building the agent on first access
+    if name == "agent":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def build_agent() -> Agent:
+    # The tools' RunContext annotations are resolved against this module's globals
+    global RunContext
+    from pydantic_ai import Agent, RunContext
+    from history import compact_history
+    return Agent(
+        model,
+        deps_type=CartDeps,
+        tools=[manage_cart, manage_cart_bulk, search_products],
+        # Keep prompts bounded: recent turns verbatim, older tool calls summarised
+        history_processors=[compact_history],
+        system_prompt=(
+            "You are a helpful shopping assistant. Use the manage_cart tool for all cart operations:\n"
+            "- action='add' to add products (quantity defaults to 1)\n"
+            "- action='remove' to remove products from cart\n"
+            "- action='update' with the EXACT quantity parameter the user specifies to set specific quantity\n"
+            "  * When user says 'update apple to 3', use action='update' with quantity=3\n"
+            "  * When user says 'change banana quantity to 5', use action='update' with quantity=5\n"
+            "  * When user says 'set orange to 2', use action='update' with quantity=2\n"
+            "  * IMPORTANT: Use the EXACT number the user mentions in the quantity parameter\n"
+            "When the user asks for several products in one message, make a single manage_cart_bulk call "
+            "with one item per product instead of several manage_cart calls.\n"
+            f"The store sells {len(catalog)} products. Use the search_products tool to find products and prices "
+            "when the user asks what is available or describes something without naming it exactly; "
+            "when they name a product, call manage_cart with that name directly.\n"
+            "IMPORTANT: If a user requests an item the store doesn't sell, you can still add it as a custom item.\n"
+            "For custom items, estimate a reasonable price (use the price parameter). If you're unsure, use $5.99 as default.\n"
+            "Be friendly and conversational in responses. Confirm the exact quantity when updating items."
+        )
     )
-)
 
-async def run_agent_with_logging(user_input: str, message_history: list):
+async def run_agent_with_logging(user_input: str, message_history: list, deps: CartDeps):
     """Run the agent with Logfire logging for input and output."""
-    with logfire.span('agent_interaction'):
-        # Log user input
-        logfire.info('User input received', user_input=user_input)
-        
-        # Run the agent with message history
-        result = await agent.run(user_input, message_history=message_history)
-        
-        # Log agent output
-        logfire.info('Agent output generated', agent_output=str(result.output))
-        
+    agent = get_agent()
+    # Input and output go on the span itself rather than as separate log records
+    with phase('agent_run', user_input=user_input) as span:
+        # Step through the run graph so model requests and tool-call steps are timed separately
+        async with agent.iter(user_input, message_history=message_history, deps=deps) as agent_run:
+            step, step_start = None, time.perf_counter()
+            async for node in agent_run:
+                if step:
+                    record_phase(step, time.perf_counter() - step_start)
+                step = 'model_request' if agent.is_model_request_node(node) else 'tool_calls' if agent.is_call_tools_node(node) else None
+                step_start = time.perf_counter()
+        result = agent_run.result
+        span.set_attribute('agent_output', str(result.output))
     return result
 
+async def stream_agent_with_logging(user_input: str, message_history: list, deps: CartDeps):
+    """
+    Run the agent, yielding events as they happen, with Logfire logging for input and output.
+
+    Yields ("text", delta) for text from every model response (a preamble written
+    next to a tool call as well as the final answer), ("tool_result", part) after
+    each tool returns, and finally ("done", run result).
+    """
+    from pydantic_ai.messages import FunctionToolResultEvent, PartDeltaEvent, PartStartEvent, TextPart, TextPartDelta
+    agent = get_agent()
+    with phase('agent_run', user_input=user_input, streaming=True) as span:
+        async with agent.iter(user_input, message_history=message_history, deps=deps) as agent_run:
+            wrote_text = False
+            async for node in agent_run:
+                # Time model requests and tool-call steps separately, as run_agent_with_logging does
+                step, step_start = None, time.perf_counter()
+                if agent.is_model_request_node(node):
+                    step = 'model_request'
+                    separator = " " if wrote_text else ""
+                    async with node.stream(agent_run.ctx) as request_stream:
+                        async for event in request_stream:
+                            if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart):
+                                delta = event.part.content
+                            elif isinstance(event, PartDeltaEvent) and isinstance(event.delta, TextPartDelta):
+                                delta = event.delta.content_delta
+                            else:
+                                continue
+                            if delta:
+                                # Text from a later model response continues the same chat message
+                                yield "text", separator + delta
+                                separator, wrote_text = "", True
+                elif agent.is_call_tools_node(node):
+                    step = 'tool_calls'
+                    async with node.stream(agent_run.ctx) as tool_stream:
+                        async for event in tool_stream:
+                            if isinstance(event, FunctionToolResultEvent):
+                                yield "tool_result", event.result
+                if step:
+                    record_phase(step, time.perf_counter() - step_start)
+        span.set_attribute('agent_output', str(agent_run.result.output))
+        yield "done", agent_run.result
+
 async def main():
     message_history = []  # Initialize empty message history
+    deps = CartDeps(cart=Cart())
     
     print("Chat with the agent (type 'exit', 'quit', or 'bye' to end)")
     print("-" * 60)
@@ -122,7 +263,7 @@ async def main():
             break
         
         # Run agent with logging
-        result = await run_agent_with_logging(user_message, message_history)
+        result = await run_agent_with_logging(user_message, message_history, deps)
         print(f"Agent: {result.output}")
         
         # Update message history with new messages from this run
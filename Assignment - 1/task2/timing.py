@@ -0,0 +1,121 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Histogram bucket upper bounds in seconds (Prometheus defaults)
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (metric, labels) -> [bucket counts..., +Inf count, sum]
+_histograms = {}
+# prefix -> module-level stats dict exported as-is (fast_path_stats, lock_stats, ...)
+_stats = {}
+# Phases timed during the current request, for its Server-Timing header
+_request_phases = ContextVar("request_phases", default=None)
+
+
+def observe(metric: str, seconds: float, **labels) -> None:
+    """Add one observation to a histogram"""
+    key = (metric, tuple(sorted(labels.items())))
+    entry = _histograms.get(key)
+    if entry is None:
+        entry = _histograms[key] = [0] * (len(BUCKETS) + 2)
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            entry[i] += 1
+    entry[-2] += 1
+    entry[-1] += seconds
+
+
+def record_phase(name: str, seconds: float) -> None:
+    """Record a phase timed elsewhere (e.g. between agent graph nodes)"""
+    observe("shop_phase_seconds", seconds, phase=name)
+    phases = _request_phases.get()
+    if phases is not None:
+        phases.append((name, seconds))
+
+
+@contextmanager
+def phase(name: str, **attributes):
+    """Time a block as a Logfire span (yielded) and in the local shop_phase_seconds histogram"""
+    import logfire  # loaded with telemetry on first use, not when the app is imported
+    start = time.perf_counter()
+    try:
+        with logfire.span(name, **attributes) as span:
+            yield span
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+def register_stats(prefix: str, stats: dict) -> None:
+    """Export a module's numeric stats dict on /metrics as shop_<prefix>_<key>"""
+    _stats[prefix] = stats
+
+
+def _route_label(scope) -> str:
+    # The matched route's template (e.g. /stream/{turn_id}), set by the router; one
+    # fixed label for everything else (404s, scanners) keeps label cardinality bounded
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of every histogram and registered stats dict"""
+    lines = []
+    seen = set()
+    for (metric, labels), entry in sorted(_histograms.items()):
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# TYPE {metric} histogram")
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+        sep = "," if label_text else ""
+        for bound, count in zip(BUCKETS, entry):
+            lines.append(f'{metric}_bucket{{{label_text}{sep}le="{bound}"}} {count}')
+        lines.append(f'{metric}_bucket{{{label_text}{sep}le="+Inf"}} {entry[-2]}')
+        lines.append(f"{metric}_count{{{label_text}}} {entry[-2]}")
+        lines.append(f"{metric}_sum{{{label_text}}} {entry[-1]:.6f}")
+    for prefix, stats in sorted(_stats.items()):
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                lines.append(f"shop_{prefix}_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware timing every HTTP request.
+
+    Observes shop_http_request_seconds per route/method/status and adds a
+    Server-Timing header listing the phases the request went through, so the
+    breakdown also shows up in the browser's network panel. `setup` runs once,
+    before the first request, for work deferred out of import time.
+    """
+
+    def __init__(self, app, setup=None):
+        self.app = app
+        self.setup = setup
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        if self.setup:
+            self.setup()
+            self.setup = None
+        start = time.perf_counter()
+        phases = []
+        token = _request_phases.set(phases)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if phases:
+                    timing = ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in phases)
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_phases.reset(token)
+            observe("shop_http_request_seconds", time.perf_counter() - start,
+                    route=_route_label(scope), method=scope["method"], status=status)
@@ -0,0 +1,56 @@
+"""
+Telemetry settings shared by the research agent (task1) and the shopping app (task2).
+
+Environment variables:
+    TELEMETRY=off                      no spans recorded or exported, no agent instrumentation
+    TELEMETRY_SAMPLE_RATE=0.1          head sampling: keep this fraction of traces (default 1.0)
+    TELEMETRY_MAX_ATTRIBUTE_LENGTH=500 truncate span attribute values (default 2000 characters)
+    TELEMETRY_CONSOLE=1                also print spans to the console (synchronous, dev only)
+
+Spans are exported in the background by a bounded batch processor, so a slow
+or unreachable collector drops spans instead of slowing requests down.
+"""
+import os
+
+
+def telemetry_settings() -> dict:
+    enabled = os.getenv("TELEMETRY", "on").lower() not in ("off", "0", "false")
+    return {
+        "enabled": enabled,
+        "sample_rate": float(os.getenv("TELEMETRY_SAMPLE_RATE", 1.0)) if enabled else 0.0,
+        "max_attribute_length": int(os.getenv("TELEMETRY_MAX_ATTRIBUTE_LENGTH", 2000)),
+        "console": enabled and os.getenv("TELEMETRY_CONSOLE", "0") == "1",
+    }
+
+
+def configure_telemetry(instrument_agents: bool = True) -> dict:
+    """Configure logfire from the environment; returns the settings used"""
+    import logfire
+    settings = telemetry_settings()
+    # Read by the OpenTelemetry SDK when logfire builds its tracer provider and batch processor
+    os.environ.setdefault("OTEL_ATTRIBUTE_VALUE_LENGTH_LIMIT", str(settings["max_attribute_length"]))
+    os.environ.setdefault("OTEL_BSP_MAX_QUEUE_SIZE", "2048")
+    os.environ.setdefault("OTEL_BSP_MAX_EXPORT_BATCH_SIZE", "512")
+    os.environ.setdefault("OTEL_BSP_SCHEDULE_DELAY", "1000")
+
+    logfire.configure(
+        send_to_logfire="if-token-present" if settings["enabled"] else False,
+        # The console exporter writes each span synchronously; keep it out of the request path
+        console=None if settings["console"] else False,
+        # Unsampled traces create non-recording spans, which cost next to nothing
+        sampling=logfire.SamplingOptions(head=settings["sample_rate"]),
+    )
+    if settings["enabled"] and instrument_agents:
+        logfire.instrument_pydantic_ai()
+    return settings
+
+
+_settings = None
+
+
+def ensure_telemetry() -> dict:
+    """configure_telemetry() on first call; lets apps defer it out of import time"""
+    global _settings
+    if _settings is None:
+        _settings = configure_telemetry()
+    return _settings
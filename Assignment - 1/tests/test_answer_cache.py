@@ -0,0 +1,64 @@
+import asyncio
+import os
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-test")
+
+import httpx
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
+from pydantic_ai.models.function import FunctionModel
+
+
+def remembering_model() -> FunctionModel:
+    """Answers "what is my name?" from earlier turns, like a real model would"""
+
+    def respond(messages, info) -> ModelResponse:
+        prompts = [part.content for message in messages for part in message.parts if isinstance(part, UserPromptPart)]
+        if re.search(r"what is my name", prompts[-1], re.I):
+            names = [m.group(1) for prompt in prompts[:-1] for m in [re.search(r"my name is (\w+)", prompt, re.I)] if m]
+            return ModelResponse(parts=[TextPart(content=f"Your name is {names[-1]}." if names else "I don't know your name yet.")])
+        return ModelResponse(parts=[TextPart(content="Nice to meet you!")])
+
+    return FunctionModel(respond)
+
+
+async def send(client, session_id: str, message: str) -> str:
+    response = await client.post("/send", data={"message": message}, headers={"Cookie": f"session_id={session_id}"})
+    return response.text
+
+
+def test_sessions_do_not_share_history_dependent_answers():
+    import ecommerce_ui
+    from task2 import agent
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=ecommerce_ui.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with agent.override(model=remembering_model()):
+                await send(client, "cache-a", "my name is Alice")
+                assert "Your name is Alice." in await send(client, "cache-a", "What is my name?")
+                # Same question, same (empty) cart, different conversation
+                return await send(client, "cache-b", "What is my name?")
+
+    reply = asyncio.run(scenario())
+    assert "Alice" not in reply
+    assert "know your name yet." in reply
+
+
+def test_only_same_history_hits():
+    from answer_cache import AnswerCache
+    from cart import Cart
+    from task2 import catalog
+
+    cache = AnswerCache()
+    cart = Cart()
+    history = [ModelRequest(parts=[UserPromptPart(content="my name is Alice")]),
+               ModelResponse(parts=[TextPart(content="Nice to meet you!")])]
+    new_messages = [ModelRequest(parts=[UserPromptPart(content="What is my name?")]),
+                    ModelResponse(parts=[TextPart(content="Your name is Alice.")])]
+    cache.put("What is my name?", catalog, cart, history, "Your name is Alice.", new_messages)
+    assert cache.get("What is my name?", catalog, cart, []) is None
+    assert cache.get("what is my name", catalog, cart, list(history)) == "Your name is Alice."
@@ -0,0 +1,48 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+
+from pydantic_ai.messages import (
+    ModelRequest, ModelResponse, SystemPromptPart, UserPromptPart, TextPart, ToolCallPart, ToolReturnPart,
+)
+from cart import Cart
+from history import SUMMARY_PREFIX, compact_messages, estimate_tokens
+
+
+def turn(i: int) -> list:
+    call_id = f"call-{i}"
+    return [
+        ModelRequest(parts=[UserPromptPart(content=f"add product {i} please")]),
+        ModelResponse(parts=[ToolCallPart(tool_name="manage_cart", tool_call_id=call_id,
+                                          args={"product_name": f"P{i}", "action": "add", "quantity": 1})]),
+        ModelRequest(parts=[ToolReturnPart(tool_name="manage_cart", tool_call_id=call_id,
+                                           content=f"OK: P{i} quantity is now 1 ($1.00 each).")]),
+        ModelResponse(parts=[TextPart(content=f"Added product {i} to your cart.")]),
+    ]
+
+
+def summaries(messages: list) -> list:
+    return [part for msg in messages for part in msg.parts
+            if isinstance(part, SystemPromptPart) and part.content.startswith(SUMMARY_PREFIX)]
+
+
+def test_repeated_compaction_keeps_one_current_summary():
+    cart = Cart()
+    history = [ModelRequest(parts=[SystemPromptPart(content="You are a helpful shopping assistant.")])]
+    for i in range(30):
+        cart.set_quantity(f"P{i}", 1, 1.0)
+        # Like pydantic-ai, feed each processed history back in with the new turn appended
+        history = compact_messages(history + turn(i), cart, keep_turns=2, token_budget=300)
+        found = summaries(history)
+        # Compaction starts once there are more than keep_turns turns
+        assert len(found) == (1 if i >= 2 else 0), f"turn {i}: {len(found)} summary parts"
+    # Cart changes outside the agent (fast path, +/- buttons) show up too
+    cart.set_quantity("Salt", 3, 2.5)
+    history = compact_messages(history + turn(30), cart, keep_turns=2, token_budget=300)
+    (summary,) = summaries(history)
+    assert "Salt x3" in summary.content
+    assert estimate_tokens(history) <= 300
+    assert "P0 x1" in summary.content and "P29 x1" in summary.content
+    assert sum(isinstance(p, SystemPromptPart) and not p.content.startswith(SUMMARY_PREFIX)
+               for msg in history for p in msg.parts) == 1
@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task1"))
+
+from response_cache import ResponseCache, response_cache_key
+
+
+def test_distinct_queries_get_distinct_keys():
+    queries = ["C++ tutorial", "C# tutorial", "C tutorial", "vitamin A benefits", "vitamin benefits",
+               "python vs rust", "rust vs python", "I need a tutorial", "need tutorial"]
+    keys = [response_cache_key(query) for query in queries]
+    assert len(set(keys)) == len(queries)
+
+
+def test_case_and_whitespace_share_a_key():
+    assert response_cache_key("  Latest AI\tnews ") == response_cache_key("latest ai news")
+
+
+def test_cached_output_is_per_query(tmp_path):
+    cache = ResponseCache(str(tmp_path / "research_cache.db"))
+    cache.put("C++ tutorial", {"summary": "C++"})
+    assert cache.get("c++  Tutorial") == {"summary": "C++"}
+    assert cache.get("C tutorial") is None
+    cache.close()
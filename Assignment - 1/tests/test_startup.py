@@ -0,0 +1,20 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import bench_startup
+
+
+def test_heavy_modules_load_on_first_use_not_at_import():
+    for module, cwd in bench_startup.TARGETS.items():
+        _, imported = bench_startup.import_profile(module, cwd)
+        assert bench_startup.early_imports(imported) == [], module
+
+
+def test_startup_within_budget():
+    budget = json.loads(bench_startup.BUDGET_FILE.read_text())
+    _, multiples = bench_startup.startup_multiples(runs=5)
+    for module, (_, multiple) in multiples.items():
+        assert multiple <= budget[module], f"{module} took {multiple:.1f}x bare interpreter startup (budget {budget[module]}x)"
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "task2"))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-test")
+
+import httpx
+from pydantic_ai.messages import ToolReturnPart
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+
+def preamble_model() -> FunctionModel:
+    """Writes a preamble next to each manage_cart call, then answers once the tools have returned"""
+
+    async def stream(messages, info):
+        # Tool returns since the user's message (the session starts empty, so that is the whole history)
+        returns = [part for message in messages for part in message.parts if isinstance(part, ToolReturnPart)]
+        if len(returns) == 2:
+            yield "All done, "
+            yield "enjoy!"
+            return
+        if returns:
+            yield "Now the salt."
+            yield {1: DeltaToolCall(name="manage_cart", json_args='{"product_name": "Salt", "action": "add"}',
+                                    tool_call_id="call-salt")}
+            return
+        yield "Sure, "
+        yield "adding soap."
+        yield {1: DeltaToolCall(name="manage_cart", json_args='{"product_name": "Soap", "action": "add"}',
+                                tool_call_id="call-soap")}
+
+    return FunctionModel(stream_function=stream)
+
+
+def sse_events(body: str) -> list:
+    """(event, data) pairs in stream order, multi-line data joined"""
+    events = []
+    for block in body.replace("\r\n", "\n").split("\n\n"):
+        kind = re.search(r"^event: (\w+)", block, re.M)
+        if kind:
+            events.append((kind.group(1), "\n".join(re.findall(r"^data: ?(.*)", block, re.M))))
+    return events
+
+
+def test_stream_keeps_every_response_and_updates_cart_per_tool():
+    import ecommerce_ui
+    from task2 import agent
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=ecommerce_ui.app)
+        headers = {"Cookie": "session_id=stream-test"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with agent.override(model=preamble_model()):
+                sent = await client.post("/send/stream", data={"message": "soap and salt please"}, headers=headers)
+                turn_id = re.search(r'sse-connect="/stream/(\w+)"', sent.text).group(1)
+                stream = await client.get(f"/stream/{turn_id}", headers=headers)
+            messages = await client.get("/messages", headers=headers)
+        return stream.text, messages.text
+
+    body, history = asyncio.run(scenario())
+    events = sse_events(body)
+    kinds = [kind for kind, _ in events]
+    text = "".join(re.sub(r"</?span>", "", data) for kind, data in events if kind == "chunk")
+
+    assert text == "Sure, adding soap. Now the salt. All done, enjoy!"
+    # A cart update right after each manage_cart return, before the text that follows it
+    assert kinds.count("cart") == 2
+    assert kinds.index("cart") < [i for i, (kind, data) in enumerate(events) if "Now the salt" in data][0]
+    assert "Soap" in events[kinds.index("cart")][1]
+    assert kinds[-1] == "done"
+    assert "Sure, adding soap. Now the salt. All done, enjoy!" in history
+
+
+def test_stream_records_agent_phases_and_bounded_route_labels():
+    import ecommerce_ui
+    from task2 import agent
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=ecommerce_ui.app)
+        headers = {"Cookie": "session_id=stream-metrics"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            before = (await client.get("/metrics")).text
+            with agent.override(model=preamble_model()):
+                sent = await client.post("/send/stream", data={"message": "soap and salt please"}, headers=headers)
+                turn_id = re.search(r'sse-connect="/stream/(\w+)"', sent.text).group(1)
+                await client.get(f"/stream/{turn_id}", headers=headers)
+            await client.get("/wp-login.php")
+            return before, (await client.get("/metrics")).text
+
+    def phase_counts(metrics: str) -> dict:
+        return {name: int(count) for name, count in re.findall(r'shop_phase_seconds_count\{phase="([^"]*)"\} (\d+)', metrics)}
+
+    before, after = asyncio.run(scenario())
+    routes = set(re.findall(r'shop_http_request_seconds_count\{[^}]*route="([^"]*)"', after))
+    assert {"/stream/{turn_id}", "unmatched"} <= routes
+    assert not any("wp-login" in route or re.search(r"/stream/\w{32}", route) for route in routes)
+    # Three model responses in the streamed run, each followed by a tool-call step (the last one ends the run)
+    counts, previous = phase_counts(after), phase_counts(before)
+    assert counts["model_request"] - previous.get("model_request", 0) == 3
+    assert counts["tool_calls"] - previous.get("tool_calls", 0) == 3